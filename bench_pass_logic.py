@@ -0,0 +1,192 @@
+"""
+Benchmarks reproducibles de pass_logic.
+
+Mide los caminos más usados (generación, validación, encriptado, `enlistar`,
+`log_event` y las fuentes de aleatoriedad) con semillas fijas y deja el resultado en JSON para poder comparar
+versiones. No pide datos por teclado ni imprime colores: la salida de `validar`
+se descarta y el único texto que se escribe es el JSON.
+
+Uso:
+    python bench_pass_logic.py                    # JSON por stdout
+    python bench_pass_logic.py -o bench.json --repeticiones 7 --semilla 1234
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import pass_logic
+
+
+def medir(nombre, funcion, numero, repeticiones, semilla, **parametros):
+    """
+    Ejecuta `funcion` `numero` veces por repetición y resume los tiempos.
+
+    Parámetros:
+        nombre: Nombre del caso.
+        funcion: Función sin argumentos a medir.
+        numero: Llamadas por repetición.
+        repeticiones: Cantidad de repeticiones (se informa la mejor y la mediana).
+        semilla: Semilla de `random` que se fija antes de cada repetición.
+        parametros: Datos del caso que se copian al resultado.
+
+    Returns:
+        dict: Resultado del caso.
+    """
+    tiempos = []
+    for _ in range(repeticiones):
+        random.seed(semilla)
+        inicio = time.perf_counter()
+        for _ in range(numero):
+            funcion()
+        tiempos.append((time.perf_counter() - inicio) / numero)
+    mejor = min(tiempos)
+    return {
+        "nombre": nombre,
+        "parametros": parametros,
+        "llamadas": numero,
+        "repeticiones": repeticiones,
+        "mejor_s": mejor,
+        "mediana_s": statistics.median(tiempos),
+        "por_segundo": 1 / mejor if mejor else None,
+    }
+
+
+def _numero_para(largo, base=20000):
+    """Cantidad de llamadas por repetición, menor cuanto más larga la entrada."""
+    return max(20, base // max(largo, 1))
+
+
+def casos_contraseñas(repeticiones, semilla):
+    """crear_contraseña a distintos largos y crear_contraseñas por lotes de 1000."""
+    resultados = []
+    for largo in (12, 20, 64, 256, 1024):
+        resultados.append(medir("crear_contraseña", lambda: pass_logic.crear_contraseña(largo),
+                                _numero_para(largo, 200000), repeticiones, semilla, largo=largo))
+    for largo in (12, 20, 64):
+        resultados.append(medir("crear_contraseñas", lambda: pass_logic.crear_contraseñas(1000, largo),
+                                5, repeticiones, semilla, cantidad=1000, largo=largo))
+    return resultados
+
+
+def casos_aleatorio(repeticiones, semilla):
+    """crear_contraseña y encriptar con cada fuente: `random`, PozoEntropia y GeneradorDeterminista."""
+    fuentes = (("random", None), ("pozo_entropia", pass_logic.PozoEntropia()),
+               ("determinista", pass_logic.GeneradorDeterminista(semilla)))
+    clave = "Ab#45678abcdEFGH1234"
+    resultados = []
+    for nombre, rng in fuentes:
+        resultados.append(medir("crear_contraseña", lambda: pass_logic.crear_contraseña(20, rng),
+                                10000, repeticiones, semilla, largo=20, rng=nombre))
+        resultados.append(medir("encriptar", lambda: pass_logic.encriptar(clave, rng=rng),
+                                10000, repeticiones, semilla, largo=len(clave), rng=nombre))
+    return resultados
+
+
+def casos_validar(repeticiones, semilla):
+    """validar sobre contraseñas válidas e inválidas."""
+    random.seed(semilla)
+    validas = pass_logic.crear_contraseñas(200, 20)
+    invalidas = ["abc", "solominusculasyletras", "SINNUMEROS!!abcd", "admin#1234ABCD", "123456789012"] * 40
+
+    def validar_todas(contraseñas):
+        for contraseña in contraseñas:
+            try:
+                pass_logic.validar(contraseña)
+            except pass_logic.ContraseñaInvalidaError:
+                pass
+
+    resultados = []
+    # validar imprime el nivel: se descarta para no medir la terminal
+    with open(os.devnull, "w", encoding="utf-8") as nulo, contextlib.redirect_stdout(nulo):
+        for tipo, contraseñas in (("validas", validas), ("invalidas", invalidas)):
+            resultados.append(medir("validar", lambda: validar_todas(contraseñas), 10, repeticiones, semilla,
+                                    entradas=tipo, contraseñas_por_llamada=len(contraseñas)))
+    return resultados
+
+
+def casos_encriptado(repeticiones, semilla):
+    """Ida y vuelta encriptar/desencriptar y enlistar, de 12 a 4096 caracteres."""
+    resultados = []
+    for largo in (12, 64, 256, 1024, 4096):
+        random.seed(semilla)
+        clave = pass_logic.crear_contraseña(largo)
+        enc, cadena = pass_logic.encriptar(clave)
+
+        def ida_y_vuelta():
+            enc, cadena = pass_logic.encriptar(clave)
+            pass_logic.desencriptar(enc, pass_logic.enlistar(cadena))
+
+        numero = _numero_para(largo, 100000)
+        resultados.append(medir("encriptar+desencriptar", ida_y_vuelta, numero, repeticiones, semilla, largo=largo))
+        resultados.append(medir("enlistar", lambda: pass_logic.enlistar(cadena), numero, repeticiones, semilla,
+                                largo=largo, bytes_cadena=len(cadena)))
+    return resultados
+
+
+def casos_log(repeticiones, semilla, tandas=8, eventos_por_tanda=2000):
+    """Escribe tandas sucesivas en el mismo archivo para ver cómo escala con el tamaño del log."""
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        archivo = os.path.join(directorio, "eventos_log.csv")
+        for tanda in range(tandas):
+            def escribir():
+                for i in range(eventos_por_tanda):
+                    pass_logic.log_event("bench", "INFO", "evento de prueba", usuario=f"u{i % 50}",
+                                         funcion="bench", filename=archivo)
+
+            tamaño = os.path.getsize(archivo) if os.path.exists(archivo) else 0
+            resultado = medir("log_event", escribir, 1, 1, semilla, tanda=tanda,
+                              eventos=eventos_por_tanda, bytes_log_inicial=tamaño)
+            resultado["eventos_por_segundo"] = eventos_por_tanda / resultado["mejor_s"]
+            resultados.append(resultado)
+    return resultados
+
+
+CASOS = {
+    "contraseñas": casos_contraseñas,
+    "aleatorio": casos_aleatorio,
+    "validar": casos_validar,
+    "encriptado": casos_encriptado,
+    "log": casos_log,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks reproducibles de pass_logic (salida JSON).")
+    parser.add_argument("-o", "--salida", default="-", help="archivo JSON de salida ('-' = stdout)")
+    parser.add_argument("--repeticiones", type=int, default=5, help="repeticiones por caso (por omisión 5)")
+    parser.add_argument("--semilla", type=int, default=1234, help="semilla de random (por omisión 1234)")
+    parser.add_argument("--casos", nargs="+", choices=sorted(CASOS), default=list(CASOS),
+                        help="grupos de casos a ejecutar (por omisión todos)")
+    args = parser.parse_args(argv)
+
+    resultados = []
+    for nombre in args.casos:
+        resultados.extend(CASOS[nombre](args.repeticiones, args.semilla))
+
+    informe = {
+        "python": platform.python_version(),
+        "implementacion": platform.python_implementation(),
+        "plataforma": platform.platform(),
+        "semilla": args.semilla,
+        "repeticiones": args.repeticiones,
+        "resultados": resultados,
+    }
+    texto = json.dumps(informe, ensure_ascii=False, indent=2)
+    if args.salida == "-":
+        print(texto)
+    else:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,32 @@
 import random
 import os
-import platform
+import math
+import itertools
+import sys
+import time
+import base64
+import atexit
+import functools
+import json
+import mmap
+import glob
+import heapq
+import re
+import queue
+import struct
+import threading
+from array import array
+from collections import Counter, OrderedDict, deque, namedtuple
 from datetime import datetime
-from colorama import Fore, Style, init #instalar colorama en la terminal con python3 install colorama 
-init()
+
+try:
+    import fcntl
+except ImportError:     # Windows: la rotación del log no se coordina entre procesos
+    fcntl = None
+
+# Modo sin terminal (procesos por lotes, servicios): PASS_LOGIC_HEADLESS=1 o activar_modo_headless().
+# Sin este modo, colorama igual se importa recién la primera vez que se necesita un color.
+HEADLESS = os.environ.get("PASS_LOGIC_HEADLESS", "").strip().lower() not in ("", "0", "false", "no")
 
 # ==== Excepciones personalizadas ====
 class UsuarioNoExisteError(Exception):
@@ -28,6 +51,19 @@ class EntradaInvalidaError(Exception):
 class ContraseñaInvalidaError(Exception):
     """Se dispara cuando la contraseña no cumple los requisitos mínimos."""
     pass
+class ContraseñaReutilizadaError(ContraseñaInvalidaError):
+    """Se dispara cuando la contraseña ya está en el historial del usuario."""
+    pass
+
+
+ENCABEZADO_LOG = "fecha;gravedad;evento;usuario;funcion;mensaje;extra\n"
+_registro_asincrono = None      # ver activar_log_asincrono()
+_perfilador = None              # ver activar_perfilado()
+_cache_credenciales = None      # ver activar_cache_credenciales()
+_filtro_contraseñas = None      # ver cargar_filtro_contraseñas()
+_rotacion_log = None            # ver activar_rotacion_log()
+_metricas_seguridad = None      # ver activar_metricas_seguridad()
+_CODIGOS_ANSI = re.compile(r"\x1b\[[0-9;]*[A-Za-z]")
 
 
 def log_event(evento, nivel="INFO", mensaje="", usuario="", funcion="", extra="", filename=None):
@@ -45,6 +81,9 @@ def log_event(evento, nivel="INFO", mensaje="", usuario="", funcion="", extra=""
 
     - Si el archivo no existe, se crea con encabezado.
     - No interrumpe la ejecución en caso de error de escritura.
+    - Con `activar_log_asincrono()` el evento solo se encola y lo escribe un hilo aparte.
+    - Con `activar_rotacion_log()` el archivo se rota a segmentos comprimidos al crecer.
+    - Con `activar_metricas_seguridad()` el evento también se cuenta en memoria.
     """
     
     if filename is None:
@@ -55,49 +94,1560 @@ def log_event(evento, nivel="INFO", mensaje="", usuario="", funcion="", extra=""
         mensaje = "".join(mensaje.splitlines())
     if "\n" in extra:
         extra = "".join(extra.splitlines())
+    # Sin códigos de color en el CSV
+    if "\x1b" in mensaje:
+        mensaje = _CODIGOS_ANSI.sub("", mensaje)
+    if "\x1b" in extra:
+        extra = _CODIGOS_ANSI.sub("", extra)
+
+    metricas = _metricas_seguridad
+    if metricas is not None:
+        metricas.registrar(evento, usuario)
+
+    # Con el log asincrónico activo solo se encola; el hilo escribe por lotes
+    registro = _registro_asincrono
+    if registro is not None and registro.encolar(filename, time.time(), (nivel, evento, usuario, funcion, mensaje, extra)):
+        return
 
     fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     linea = f"{fecha};{nivel};{evento};{usuario};{funcion};{mensaje};{extra}\n"
 
-    try:
-        # existe el archivo? si no, escribimos encabezado primero
-        escribir_header = False
-        try:
-            with open(filename, "r", encoding="utf-8") as arch:
-                pass
-        except OSError:
-            escribir_header = True
+    rotacion = _rotacion_log
+    if rotacion is not None:
+        rotacion.escribir(filename, [linea])
+        return
 
+    try:
         with open(filename, "a", encoding="utf-8") as f:
-            if escribir_header:
-                f.write("fecha;gravedad;evento;usuario;funcion;mensaje;extra\n")
+            # archivo recién creado (o vacío): encabezado primero
+            if f.tell() == 0:
+                f.write(ENCABEZADO_LOG)
             f.write(linea)
+        if _perfilador is not None:
+            _perfilador.sumar_bytes("log_event", escritos=len(linea.encode("utf-8")))
     except OSError:
         # nunca cortamos la app por un fallo de log
         pass
 
 
+class RegistroAsincrono:
+    """
+    Escritor de logs en segundo plano para `log_event`.
+
+    Los eventos se encolan desde el hilo que llama y un hilo aparte los escribe por
+    lotes: un solo `open` por lote y por archivo. El encabezado se escribe si el
+    archivo está vacío al abrirlo (también tras una rotación). Se vacía solo al
+    terminar el programa (atexit).
+
+    Parámetros:
+        intervalo (float, opcional): Segundos máximos que un evento espera en memoria. Por defecto 0.5.
+        tamaño_lote (int, opcional): Eventos que disparan una escritura inmediata. Por defecto 500.
+        capacidad (int, opcional): Eventos máximos en cola; si se llena, `log_event` escribe directo. Por defecto 100000.
+    """
+
+    _FIN = object()
+
+    def __init__(self, intervalo=0.5, tamaño_lote=500, capacidad=100000):
+        self.intervalo = intervalo
+        self.tamaño_lote = tamaño_lote
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._ultimo_segundo = None
+        self._ultima_fecha = ""
+        self._cerrado = False
+        # Ordena encolar/vaciar respecto de cerrar: nada entra a la cola después de _FIN
+        self._candado = threading.Lock()
+        self._hilo = threading.Thread(target=self._ejecutar, name="log_event", daemon=True)
+        self._hilo.start()
+        atexit.register(self.cerrar)
+
+    def encolar(self, filename, instante, campos):
+        """Encola un evento. Devuelve False si no se pudo (cerrado o cola llena)."""
+        with self._candado:
+            if self._cerrado:
+                return False
+            try:
+                self._cola.put_nowait((filename, instante, campos))
+            except queue.Full:
+                return False
+        return True
+
+    def vaciar(self, timeout=None):
+        """Espera a que se escriban todos los eventos encolados hasta ahora."""
+        listo = threading.Event()
+        with self._candado:
+            if self._cerrado:
+                return
+            self._cola.put(listo)
+        listo.wait(timeout)
+
+    def cerrar(self, timeout=None):
+        """Escribe lo pendiente y detiene el hilo. Se puede llamar más de una vez."""
+        with self._candado:
+            if self._cerrado:
+                return
+            self._cerrado = True
+            self._cola.put(self._FIN)
+        self._hilo.join(timeout)
+        atexit.unregister(self.cerrar)
+        if self._hilo.is_alive():
+            return
+        # Lo que haya quedado en la cola detrás de _FIN se escribe desde este hilo
+        restantes = []
+        while True:
+            try:
+                item = self._cola.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                self._escribir(restantes)
+                restantes = []
+                item.set()
+            elif item is not self._FIN:
+                restantes.append(item)
+        self._escribir(restantes)
+
+    def _fecha(self, instante):
+        # Muchos eventos caen en el mismo segundo: se reutiliza el texto ya formateado
+        segundo = int(instante)
+        if segundo != self._ultimo_segundo:
+            self._ultimo_segundo = segundo
+            self._ultima_fecha = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(segundo))
+        return self._ultima_fecha
+
+    def _ejecutar(self):
+        pendientes = []
+        limite = None
+        while True:
+            espera = None if limite is None else max(0, limite - time.monotonic())
+            try:
+                item = self._cola.get(timeout=espera)
+            except queue.Empty:
+                item = None
+
+            if item is self._FIN or isinstance(item, threading.Event):
+                self._escribir(pendientes)
+                pendientes = []
+                limite = None
+                if item is self._FIN:
+                    return
+                item.set()
+                continue
+
+            if item is not None:
+                pendientes.append(item)
+                if limite is None:
+                    limite = time.monotonic() + self.intervalo
+            if len(pendientes) >= self.tamaño_lote or (limite is not None and time.monotonic() >= limite):
+                self._escribir(pendientes)
+                pendientes = []
+                limite = None
+
+    def _escribir(self, eventos):
+        por_archivo = {}
+        for filename, instante, campos in eventos:
+            por_archivo.setdefault(filename, []).append(f"{self._fecha(instante)};{';'.join(campos)}\n")
+
+        for filename, lineas in por_archivo.items():
+            rotacion = _rotacion_log
+            if rotacion is not None:
+                rotacion.escribir(filename, lineas)
+                continue
+            try:
+                with open(filename, "a", encoding="utf-8") as f:
+                    # archivo nuevo (o recién rotado): encabezado primero
+                    if f.tell() == 0:
+                        f.write(ENCABEZADO_LOG)
+                    f.writelines(lineas)
+                if _perfilador is not None:
+                    _perfilador.sumar_bytes("log_event", escritos=sum(len(l.encode("utf-8")) for l in lineas))
+            except Exception:
+                # nunca cortamos la app por un fallo de log (ni matamos el hilo)
+                pass
+
+
+def activar_log_asincrono(intervalo=0.5, tamaño_lote=500):
+    """
+    Hace que `log_event` encole los eventos y los escriba un hilo en segundo plano.
+
+    Parámetros:
+        intervalo (float, opcional): Segundos máximos entre escrituras. Por defecto 0.5.
+        tamaño_lote (int, opcional): Eventos por escritura. Por defecto 500.
+
+    Returns:
+        RegistroAsincrono: El escritor activo.
+    """
+    global _registro_asincrono
+    desactivar_log_asincrono()
+    _registro_asincrono = RegistroAsincrono(intervalo, tamaño_lote)
+    return _registro_asincrono
+
+
+def desactivar_log_asincrono():
+    """Vuelve a la escritura directa de `log_event`, escribiendo antes lo que quedó en cola."""
+    global _registro_asincrono
+    registro, _registro_asincrono = _registro_asincrono, None
+    if registro is not None:
+        registro.cerrar()
+
+
+def _normalizar_rango(desde, hasta):
+    """Pasa `desde`/`hasta` (str o datetime) a texto comparable con la columna fecha; 'AAAA-MM-DD' en `hasta` abarca el día entero."""
+    if isinstance(desde, datetime):
+        desde = desde.strftime("%Y-%m-%d %H:%M:%S")
+    if isinstance(hasta, datetime):
+        hasta = hasta.strftime("%Y-%m-%d %H:%M:%S")
+    elif hasta is not None and len(hasta) == 10:
+        hasta += " 23:59:59"
+    return desde, hasta
+
+
+class IndiceLog:
+    """
+    Índice auxiliar de `eventos_log.csv` para consultar sin recorrer todo el archivo.
+
+    Guarda, en una base SQLite al lado del log (`<log>.idx`), la posición en bytes de
+    cada línea con su usuario, evento y hora ('AAAA-MM-DD HH'), indexada por cada una.
+    Las consultas leen solo las líneas que coinciden, sobre el log mapeado en memoria.
+    Antes de cada consulta se insertan únicamente las líneas que `log_event` agregó
+    desde la última vez: el índice no se reescribe ni se carga entero en memoria.
+    Solo se vacía si el log fue reemplazado o truncado; al rotarlo (`RotadorLog`) el
+    índice pasa a cubrir el archivo nuevo y los segmentos rotados se buscan con
+    `leer_eventos` (`consultar --historial`).
+
+    Parámetros:
+        filename (str, opcional): Ruta del log. Por defecto 'eventos_log.csv'.
+        archivo_indice (str, opcional): Ruta del índice. Por defecto '<filename>.idx'.
+    """
+
+    COLUMNAS = ("fecha", "gravedad", "evento", "usuario", "funcion", "mensaje", "extra")
+
+    ESQUEMA = """
+        CREATE TABLE IF NOT EXISTS estado (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            bytes_indexados INTEGER NOT NULL,
+            inodo INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS lineas (
+            posicion INTEGER PRIMARY KEY,
+            usuario TEXT NOT NULL,
+            evento TEXT NOT NULL,
+            hora TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS lineas_usuario ON lineas (usuario, posicion);
+        CREATE INDEX IF NOT EXISTS lineas_evento ON lineas (evento, posicion);
+        CREATE INDEX IF NOT EXISTS lineas_hora ON lineas (hora, posicion);
+    """
+
+    def __init__(self, filename=None, archivo_indice=None):
+        self.filename = filename or "eventos_log.csv"
+        self.archivo_indice = archivo_indice or self.filename + ".idx"
+        self._conexion = None
+
+    def _conectar(self):
+        import sqlite3     # se importa solo si hace falta
+        if self._conexion is not None:
+            return self._conexion
+        try:
+            conexion = sqlite3.connect(self.archivo_indice, timeout=30, isolation_level=None)
+            try:
+                conexion.executescript(self.ESQUEMA)
+            except sqlite3.DatabaseError:
+                # Índice de una versión anterior (JSON) o dañado: se reconstruye desde cero
+                conexion.close()
+                os.remove(self.archivo_indice)
+                conexion = sqlite3.connect(self.archivo_indice, timeout=30, isolation_level=None)
+                conexion.executescript(self.ESQUEMA)
+        except (sqlite3.Error, OSError):
+            # Sin índice en disco seguimos funcionando; se recalcula la próxima vez
+            conexion = sqlite3.connect(":memory:", isolation_level=None)
+            conexion.executescript(self.ESQUEMA)
+        self._conexion = conexion
+        return conexion
+
+    def cerrar(self):
+        """Cierra la conexión con el índice (se vuelve a abrir si se consulta otra vez)."""
+        if self._conexion is not None:
+            self._conexion.close()
+            self._conexion = None
+
+    def actualizar(self):
+        """
+        Agrega al índice las líneas escritas desde la última actualización.
+
+        Returns:
+            int: Cantidad de líneas nuevas indexadas.
+
+        Raises:
+            ArchivoNoAccesibleError: Si el índice no se puede escribir.
+        """
+        import sqlite3
+        try:
+            estado = os.stat(self.filename)
+        except OSError:
+            return 0
+        conexion = self._conectar()
+        try:
+            # BEGIN IMMEDIATE: dos procesos que consultan a la vez no indexan las mismas líneas
+            conexion.execute("BEGIN IMMEDIATE")
+            try:
+                fila = conexion.execute("SELECT bytes_indexados, inodo FROM estado").fetchone()
+                tamaño, inodo = fila if fila is not None else (0, None)
+                if estado.st_ino != inodo or estado.st_size < tamaño:
+                    conexion.execute("DELETE FROM lineas")
+                    tamaño = 0
+                nuevas = 0
+                if estado.st_size > tamaño:
+                    with open(self.filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        posicion = tamaño
+
+                        def filas():
+                            nonlocal posicion, nuevas
+                            while True:
+                                fin = mm.find(b"\n", posicion)
+                                if fin == -1:
+                                    return   # línea a medio escribir: queda para la próxima
+                                campos = mm[posicion:fin].split(b";", 4)
+                                if len(campos) >= 4 and campos[0] != b"fecha":
+                                    fecha, _, evento, usuario = (c.decode("utf-8", "replace") for c in campos[:4])
+                                    nuevas += 1
+                                    yield posicion, usuario, evento, fecha[:13]
+                                posicion = fin + 1
+
+                        conexion.executemany("INSERT OR IGNORE INTO lineas VALUES (?, ?, ?, ?)", filas())
+                        tamaño = posicion
+                conexion.execute("INSERT OR REPLACE INTO estado VALUES (0, ?, ?)", (tamaño, estado.st_ino))
+                conexion.execute("COMMIT")
+            except BaseException:
+                conexion.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            raise ArchivoNoAccesibleError(f"No se pudo actualizar el índice '{self.archivo_indice}': {e}")
+        return nuevas
+
+    def consultar(self, usuario=None, evento=None, desde=None, hasta=None):
+        """
+        Devuelve los eventos del log vigente que cumplen todos los filtros indicados.
+
+        No incluye los segmentos rotados: para esos, `leer_eventos`.
+
+        Parámetros:
+            usuario (str, opcional): Usuario exacto.
+            evento (str, opcional): Evento exacto (p.ej. 'login_attempts_exceeded').
+            desde (str | datetime, opcional): Fecha inicial inclusiva ('AAAA-MM-DD[ HH:MM:SS]').
+            hasta (str | datetime, opcional): Fecha final inclusiva; si es solo el día, abarca el día entero.
+
+        Returns:
+            list: Diccionarios con las columnas del log, en el orden en que fueron escritos.
+
+        Raises:
+            ArchivoNoAccesibleError: Si el índice no se puede leer ni escribir.
+        """
+        import sqlite3
+        self.actualizar()
+        desde, hasta = _normalizar_rango(desde, hasta)
+
+        condiciones, valores = [], []
+        if usuario is not None:
+            condiciones.append("usuario = ?")
+            valores.append(usuario)
+        if evento is not None:
+            condiciones.append("evento = ?")
+            valores.append(evento)
+        if desde is not None:
+            condiciones.append("hora >= ?")
+            valores.append(desde[:13])
+        if hasta is not None:
+            condiciones.append("hora <= ?")
+            valores.append(hasta[:13])
+        consulta = "SELECT posicion FROM lineas"
+        if condiciones:
+            consulta += " WHERE " + " AND ".join(condiciones)
+        try:
+            posiciones = [fila[0] for fila in self._conectar().execute(consulta + " ORDER BY posicion", valores)]
+        except sqlite3.Error as e:
+            raise ArchivoNoAccesibleError(f"No se pudo leer el índice '{self.archivo_indice}': {e}")
+        if not posiciones:
+            return []
+
+        eventos = []
+        with open(self.filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for posicion in posiciones:
+                linea = mm[posicion:mm.find(b"\n", posicion)].decode("utf-8", "replace")
+                campos = linea.split(";", len(self.COLUMNAS) - 1)
+                fecha = campos[0]
+                if (desde is not None and fecha < desde) or (hasta is not None and fecha > hasta):
+                    continue
+                eventos.append(dict(zip(self.COLUMNAS, campos)))
+        return eventos
+
+
+class RotadorLog:
+    """
+    Rotación de los logs de `log_event` a segmentos comprimidos con gzip.
+
+    Cuando el log supera `max_bytes` (o su primer evento tiene más de `max_segundos`),
+    se renombra, se comprime a `<log>.<fecha>-<pid>-<n>.csv.gz` y se anota en un
+    manifiesto (`<log>.segmentos.json`) con la fecha del primer y del último evento,
+    para que `leer_eventos` saltee los segmentos fuera del rango pedido.
+
+    Con varios hilos o procesos escribiendo: cada escritura toma un bloqueo compartido
+    (`flock`) sobre el log y la rotación uno exclusivo, así ninguna línea cae en un
+    archivo ya renombrado; si el archivo abierto ya no es el log vigente, se vuelve a
+    abrir. Sin `fcntl` (Windows) la rotación no se coordina entre procesos.
+
+    Parámetros:
+        max_bytes (int, opcional): Tamaño que dispara la rotación. Por defecto 100 MB; None la desactiva.
+        max_segundos (float, opcional): Antigüedad del primer evento que dispara la rotación. Por defecto None.
+        directorio (str, opcional): Carpeta de los segmentos. Por defecto, la del log.
+    """
+
+    def __init__(self, max_bytes=100 * 1024 * 1024, max_segundos=None, directorio=None):
+        self.max_bytes = max_bytes
+        self.max_segundos = max_segundos
+        self.directorio = directorio
+        self._inicios = {}          # (filename, inodo) -> instante del primer evento
+        self._secuencia = itertools.count()
+
+    @staticmethod
+    def manifiesto(filename):
+        """Ruta del manifiesto de segmentos de un log."""
+        return filename + ".segmentos.json"
+
+    def escribir(self, filename, lineas):
+        """
+        Agrega líneas al log (con encabezado si está vacío) y rota si corresponde.
+
+        No interrumpe la ejecución en caso de error de escritura.
+        """
+        try:
+            while True:
+                with open(filename, "a", encoding="utf-8") as f:
+                    if fcntl is not None:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_SH)
+                        inodo = os.fstat(f.fileno()).st_ino
+                        try:
+                            vigente = os.stat(filename).st_ino == inodo
+                        except OSError:
+                            vigente = False
+                        if not vigente:
+                            continue    # se rotó entre el open y el bloqueo: se abre el nuevo
+                    else:
+                        inodo = os.fstat(f.fileno()).st_ino
+                    if f.tell() == 0:
+                        f.write(ENCABEZADO_LOG)
+                    f.writelines(lineas)
+                    tamaño = f.tell()
+                break
+            if _perfilador is not None:
+                _perfilador.sumar_bytes("log_event", escritos=sum(len(l.encode("utf-8")) for l in lineas))
+            if self._hay_que_rotar(filename, inodo, tamaño):
+                self.rotar(filename)
+        except OSError:
+            # nunca cortamos la app por un fallo de log
+            pass
+
+    def _hay_que_rotar(self, filename, inodo, tamaño):
+        if self.max_bytes is not None and tamaño >= self.max_bytes:
+            return True
+        if self.max_segundos is None:
+            return False
+        clave = (filename, inodo)
+        inicio = self._inicios.get(clave)
+        if inicio is None:
+            inicio = self._inicios[clave] = self._primer_instante(filename)
+        return inicio is not None and time.time() - inicio >= self.max_segundos
+
+    @staticmethod
+    def _primer_instante(filename):
+        """Instante del primer evento del log, o None si no se puede leer."""
+        try:
+            with open(filename, "r", encoding="utf-8", errors="replace") as f:
+                for linea in f:
+                    if not linea.startswith("fecha;"):
+                        return datetime.strptime(linea[:19], "%Y-%m-%d %H:%M:%S").timestamp()
+        except (OSError, ValueError):
+            pass
+        return None
+
+    def rotar(self, filename, forzar=False):
+        """
+        Pasa el log actual a un segmento comprimido y lo anota en el manifiesto.
+
+        Parámetros:
+            filename: Ruta del log.
+            forzar (bool, opcional): Rotar aunque no se hayan alcanzado los límites.
+
+        Returns:
+            dict | None: La entrada agregada al manifiesto, o None si no se rotó o no se pudo
+                comprimir o anotar (en ese caso el log queda en `<log>.<fecha>-<pid>-<n>.pendiente`).
+        """
+        directorio = self.directorio or os.path.dirname(os.path.abspath(filename))
+        raiz = os.path.join(directorio, os.path.basename(filename))
+        pendiente = f"{raiz}.{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(self._secuencia)}.pendiente"
+        try:
+            with open(filename, "rb") as f:
+                if fcntl is not None:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+                estado = os.fstat(f.fileno())
+                # Otro hilo o proceso pudo haber rotado mientras esperábamos el bloqueo
+                if os.stat(filename).st_ino != estado.st_ino or estado.st_size <= len(ENCABEZADO_LOG):
+                    return None
+                if not forzar and not self._hay_que_rotar(filename, estado.st_ino, estado.st_size):
+                    return None
+                os.makedirs(directorio, exist_ok=True)
+                os.replace(filename, pendiente)
+                self._inicios.pop((filename, estado.st_ino), None)
+        except OSError:
+            return None
+        return self._comprimir(filename, pendiente)
+
+    def _comprimir(self, filename, pendiente):
+        import gzip     # se importa solo si hace falta
+
+        segmento = pendiente[:-len(".pendiente")] + ".csv.gz"
+        desde = hasta = None
+        eventos = 0
+        try:
+            with open(pendiente, "rb") as entrada, gzip.open(segmento + ".tmp", "wb") as salida:
+                for linea in entrada:
+                    salida.write(linea)
+                    if linea.startswith(b"fecha;"):
+                        continue
+                    fecha = linea[:19].decode("utf-8", "replace")
+                    if desde is None or fecha < desde:
+                        desde = fecha
+                    if hasta is None or fecha > hasta:
+                        hasta = fecha
+                    eventos += 1
+            os.replace(segmento + ".tmp", segmento)
+        except OSError:
+            # el .pendiente queda en disco: no se pierden eventos
+            return None
+
+        try:
+            entrada = {"archivo": os.path.relpath(segmento, os.path.dirname(os.path.abspath(filename))),
+                       "desde": desde, "hasta": hasta, "eventos": eventos, "bytes": os.path.getsize(segmento)}
+            self._anotar(filename, entrada)
+        except OSError:
+            # Manifiesto o su lock sin escribir: sin un segmento huérfano fuera del
+            # manifiesto, los eventos quedan solo en el .pendiente, como arriba
+            try:
+                os.remove(segmento)
+            except OSError:
+                pass
+            return None
+        os.remove(pendiente)
+        return entrada
+
+    def _anotar(self, filename, entrada):
+        manifiesto = self.manifiesto(filename)
+        with open(manifiesto + ".lock", "a") as candado:
+            if fcntl is not None:
+                fcntl.flock(candado.fileno(), fcntl.LOCK_EX)
+            segmentos = leer_manifiesto(filename)
+            segmentos.append(entrada)
+            temporal = f"{manifiesto}.{os.getpid()}.tmp"
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump({"segmentos": segmentos}, f, ensure_ascii=False, indent=1)
+            os.replace(temporal, manifiesto)
+
+
+def leer_manifiesto(filename=None):
+    """
+    Segmentos rotados de un log, del más viejo al más nuevo.
+
+    Returns:
+        list: Diccionarios con 'archivo' (relativo a la carpeta del log), 'desde', 'hasta', 'eventos' y 'bytes'.
+    """
+    try:
+        with open(RotadorLog.manifiesto(filename or "eventos_log.csv"), "r", encoding="utf-8") as f:
+            return json.load(f)["segmentos"]
+    except (OSError, ValueError, KeyError):
+        return []
+
+
+def leer_eventos(filename=None, desde=None, hasta=None, usuario=None, evento=None):
+    """
+    Recorre los eventos de un log y de sus segmentos rotados, del más viejo al más nuevo.
+
+    Es un generador: lee de a una línea y no abre los segmentos cuyo rango de fechas
+    (según el manifiesto) queda fuera de `desde`/`hasta`.
+
+    Parámetros:
+        filename (str, opcional): Ruta del log. Por defecto 'eventos_log.csv'.
+        desde / hasta (str | datetime, opcional): Rango inclusivo, como en `IndiceLog.consultar`.
+        usuario / evento (str, opcional): Filtros exactos.
+
+    Yields:
+        dict: Las columnas del log de cada evento que cumple los filtros.
+    """
+    filename = filename or "eventos_log.csv"
+    desde, hasta = _normalizar_rango(desde, hasta)
+    carpeta = os.path.dirname(os.path.abspath(filename))
+    columnas = IndiceLog.COLUMNAS
+
+    archivos = []
+    for segmento in leer_manifiesto(filename):
+        if segmento["hasta"] is None:
+            continue
+        if (desde is not None and segmento["hasta"] < desde) or (hasta is not None and segmento["desde"] > hasta):
+            continue
+        archivos.append(os.path.join(carpeta, segmento["archivo"]))
+    archivos.append(filename)
+
+    for archivo in archivos:
+        try:
+            if archivo.endswith(".gz"):
+                import gzip     # se importa solo si hace falta
+                f = gzip.open(archivo, "rt", encoding="utf-8", errors="replace")
+            else:
+                f = open(archivo, "r", encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        with f:
+            for linea in f:
+                campos = linea.rstrip("\n").split(";", len(columnas) - 1)
+                if len(campos) < 4 or campos[0] == "fecha":
+                    continue
+                fecha = campos[0]
+                if (desde is not None and fecha < desde) or (hasta is not None and fecha > hasta):
+                    continue
+                if (usuario is not None and campos[3] != usuario) or (evento is not None and campos[2] != evento):
+                    continue
+                yield dict(zip(columnas, campos))
+
+
+def activar_rotacion_log(max_bytes=100 * 1024 * 1024, max_segundos=None, directorio=None):
+    """
+    Hace que `log_event` rote el log a segmentos comprimidos (ver `RotadorLog`).
+
+    Parámetros:
+        max_bytes (int, opcional): Tamaño que dispara la rotación. Por defecto 100 MB.
+        max_segundos (float, opcional): Antigüedad máxima del primer evento del log. Por defecto None.
+        directorio (str, opcional): Carpeta de los segmentos. Por defecto, la del log.
+
+    Returns:
+        RotadorLog: El rotador activo.
+    """
+    global _rotacion_log
+    _rotacion_log = RotadorLog(max_bytes, max_segundos, directorio)
+    return _rotacion_log
+
+
+def desactivar_rotacion_log():
+    """Vuelve a escribir el log sin rotarlo."""
+    global _rotacion_log
+    _rotacion_log = None
+
+
+# Eventos que cuentan como fallo de autenticación en las métricas por usuario
+EVENTOS_FALLO = ("login_attempts_exceeded", "admin_password_incorrect")
+
+
+class _Anillo:
+    """Contador por casillas de tiempo en un buffer circular: sumar es O(1) y la memoria es fija."""
+
+    __slots__ = ("cuentas", "marcas", "ultima")
+
+    def __init__(self, casillas):
+        self.cuentas = [0] * casillas
+        self.marcas = [-1] * casillas     # casilla (instante // resolución) que ocupa cada posición
+        self.ultima = -1
+
+    def sumar(self, casilla):
+        i = casilla % len(self.cuentas)
+        if self.marcas[i] != casilla:
+            # la posición tenía una casilla vieja: se reutiliza
+            self.marcas[i] = casilla
+            self.cuentas[i] = 0
+        self.cuentas[i] += 1
+        if casilla > self.ultima:
+            self.ultima = casilla
+
+    def total(self, desde):
+        """Suma de las casillas desde `desde` (inclusive)."""
+        if self.ultima < desde:
+            return 0
+        return sum(cuenta for cuenta, marca in zip(self.cuentas, self.marcas) if marca >= desde)
+
+
+class MetricasSeguridad:
+    """
+    Contadores en memoria, por ventana deslizante, de los eventos que registra `log_event`.
+
+    Lleva un contador por tipo de evento y, para los eventos de `eventos_fallo`, uno
+    por usuario. Cada contador es un buffer circular de casillas de `resolucion`
+    segundos, así que registrar un evento es O(1) y la memoria no crece con el tiempo.
+    Se guardan como mucho `max_usuarios` usuarios; al pasarse se descarta el que hace
+    más tiempo que no falla. Se puede usar desde varios hilos.
+
+    Parámetros:
+        ventana (float, opcional): Segundos que se recuerdan. Por defecto 300 (5 minutos).
+        resolucion (float, opcional): Segundos por casilla. Por defecto 5.
+        max_usuarios (int, opcional): Usuarios con contador propio. Por defecto 10000.
+        eventos_fallo (opcional): Eventos que se cuentan por usuario. Por omisión `EVENTOS_FALLO`.
+    """
+
+    def __init__(self, ventana=300.0, resolucion=5.0, max_usuarios=10000, eventos_fallo=EVENTOS_FALLO):
+        self.ventana = ventana
+        self.resolucion = resolucion
+        self.max_usuarios = max_usuarios
+        self.eventos_fallo = frozenset(eventos_fallo)
+        self._casillas = max(1, math.ceil(ventana / resolucion))
+        self._por_evento = {}
+        self._por_usuario = OrderedDict()
+        self._lock = threading.Lock()
+
+    def registrar(self, evento, usuario="", instante=None):
+        """Cuenta un evento (lo llama `log_event`)."""
+        casilla = int((time.time() if instante is None else instante) // self.resolucion)
+        with self._lock:
+            anillo = self._por_evento.get(evento)
+            if anillo is None:
+                anillo = self._por_evento[evento] = _Anillo(self._casillas)
+            anillo.sumar(casilla)
+
+            if evento in self.eventos_fallo and usuario:
+                anillo = self._por_usuario.get(usuario)
+                if anillo is None:
+                    anillo = self._por_usuario[usuario] = _Anillo(self._casillas)
+                    if len(self._por_usuario) > self.max_usuarios:
+                        self._por_usuario.popitem(last=False)
+                else:
+                    self._por_usuario.move_to_end(usuario)
+                anillo.sumar(casilla)
+
+    def _desde(self, segundos, instante):
+        segundos = self.ventana if segundos is None else min(segundos, self.ventana)
+        actual = int((time.time() if instante is None else instante) // self.resolucion)
+        return actual - max(1, math.ceil(segundos / self.resolucion)) + 1
+
+    def eventos(self, segundos=None, instante=None):
+        """
+        Cantidad de cada tipo de evento en los últimos `segundos` (por omisión, toda la ventana).
+
+        Returns:
+            dict: evento -> cantidad, sin los que quedaron en cero.
+        """
+        desde = self._desde(segundos, instante)
+        with self._lock:
+            totales = {evento: anillo.total(desde) for evento, anillo in self._por_evento.items()}
+        return {evento: total for evento, total in totales.items() if total}
+
+    def top_usuarios(self, n=10, segundos=None, instante=None):
+        """
+        Los `n` usuarios con más fallos en los últimos `segundos` (por omisión, toda la ventana).
+
+        Returns:
+            list: Tuplas (usuario, fallos), de mayor a menor.
+        """
+        desde = self._desde(segundos, instante)
+        with self._lock:
+            # Los usuarios se recorren del más reciente al más viejo: se corta en el primero sin fallos en el rango
+            totales = []
+            for usuario in reversed(self._por_usuario):
+                anillo = self._por_usuario[usuario]
+                if anillo.ultima < desde:
+                    break
+                totales.append((anillo.total(desde), usuario))
+        # A igual cantidad de fallos queda primero el usuario que falló más recientemente
+        return [(usuario, total) for total, usuario in heapq.nlargest(n, totales, key=lambda par: par[0]) if total]
+
+    def instantanea(self, top=10, segundos=None):
+        """
+        Resumen exportable (JSON) de las métricas actuales.
+
+        Returns:
+            dict: segundos, eventos (por tipo) y top_usuarios (lista de {'usuario', 'fallos'}).
+        """
+        instante = time.time()
+        segundos = self.ventana if segundos is None else min(segundos, self.ventana)
+        return {
+            "segundos": segundos,
+            "eventos": self.eventos(segundos, instante),
+            "top_usuarios": [{"usuario": usuario, "fallos": fallos}
+                             for usuario, fallos in self.top_usuarios(top, segundos, instante)],
+        }
+
+
+def activar_metricas_seguridad(ventana=300.0, resolucion=5.0, max_usuarios=10000, eventos_fallo=EVENTOS_FALLO):
+    """
+    Hace que `log_event` alimente contadores en memoria (ver `MetricasSeguridad`).
+
+    Returns:
+        MetricasSeguridad: Las métricas activas.
+    """
+    global _metricas_seguridad
+    _metricas_seguridad = MetricasSeguridad(ventana, resolucion, max_usuarios, eventos_fallo)
+    return _metricas_seguridad
+
+
+def desactivar_metricas_seguridad():
+    """
+    Deja de contar eventos en memoria.
+
+    Returns:
+        MetricasSeguridad | None: Las métricas que estaban activas (se pueden seguir consultando).
+    """
+    global _metricas_seguridad
+    metricas, _metricas_seguridad = _metricas_seguridad, None
+    return metricas
+
+
+def instantanea_metricas(top=10, segundos=None):
+    """Métricas de seguridad activas (ver `MetricasSeguridad.instantanea`), o {} si están desactivadas."""
+    return _metricas_seguridad.instantanea(top, segundos) if _metricas_seguridad is not None else {}
+
+
 #DATOS PRE-SETEADOS
 
 letras_mayusculas = ('A','B','C','D','E','F','G','H','I','J','K','L','M','N','O','P','Q','R','S','T','U','V','W','X','Y','Z','Á','É','Í','Ó','Ú','Ü','Ñ')
 letras_minusculas = ('a','b','c','d','e','f','g','h','i','j','k','l','m','n','o','p','q','r','s','t','u','v','w','x','y','z','á','é','í','ó','ú','ü','ñ')
 numeros = ('0','1','2','3','4','5','6','7','8','9')
 caracteres_especiales = ('?','!','¡','¿','.',',',':','-','_','(',')','[',']','{','}','@','#','$','%','&','/','"',"'",'+','*','=','<','>','|','^','°','~','`')
+palabras_prohibidas = ("password", "admin", "contraseña", "clave", "claves")
+secuencias_no_recomendadas = ("123", "456", "789", "abc", "ABC")
+
+
+class AutomataPatrones:
+    """
+    Busca muchos patrones a la vez en un texto (autómata de Aho-Corasick).
+
+    Se arma una sola vez y cada búsqueda recorre el texto una sola vez, sin importar
+    cuántos patrones haya. Con pocos patrones (hasta `UMBRAL_AUTOMATA`) se usa
+    directamente `in`, que para esos tamaños es más rápido que recorrer el autómata.
+
+    Parámetros:
+        patrones: Iterable de cadenas; las vacías y repetidas se ignoran.
+        ignorar_mayusculas (bool, opcional): Si es True, patrones y texto se comparan en minúsculas.
+    """
+
+    UMBRAL_AUTOMATA = 16
+
+    def __init__(self, patrones, ignorar_mayusculas=False):
+        self.ignorar_mayusculas = ignorar_mayusculas
+        if ignorar_mayusculas:
+            patrones = (p.lower() for p in patrones)
+        self.patrones = tuple(dict.fromkeys(p for p in patrones if p))
+        self._transiciones = None
+        if len(self.patrones) > self.UMBRAL_AUTOMATA:
+            self._armar()
+
+    def _armar(self):
+        # Trie: transiciones[estado] = {caracter: estado}; salidas[estado] = índices de patrones
+        transiciones = [{}]
+        salidas = [()]
+        for indice, patron in enumerate(self.patrones):
+            estado = 0
+            for caracter in patron:
+                siguiente = transiciones[estado].get(caracter)
+                if siguiente is None:
+                    siguiente = len(transiciones)
+                    transiciones[estado][caracter] = siguiente
+                    transiciones.append({})
+                    salidas.append(())
+                estado = siguiente
+            salidas[estado] += (indice,)
+
+        # Enlaces de falla por niveles (BFS); cada estado hereda las salidas de su enlace
+        fallas = [0] * len(transiciones)
+        pendientes = deque(transiciones[0].values())
+        while pendientes:
+            estado = pendientes.popleft()
+            for caracter, siguiente in transiciones[estado].items():
+                falla = fallas[estado]
+                while falla and caracter not in transiciones[falla]:
+                    falla = fallas[falla]
+                destino = transiciones[falla].get(caracter, 0)
+                fallas[siguiente] = destino if destino != siguiente else 0
+                salidas[siguiente] += salidas[fallas[siguiente]]
+                pendientes.append(siguiente)
+
+        self._transiciones = transiciones
+        self._fallas = fallas
+        self._salidas = salidas
+
+    def _recorrer(self, texto):
+        """Genera las salidas (tuplas de índices) de cada posición del texto que cierra un patrón."""
+        transiciones = self._transiciones
+        fallas = self._fallas
+        salidas = self._salidas
+        estado = 0
+        for caracter in texto:
+            while estado and caracter not in transiciones[estado]:
+                estado = fallas[estado]
+            estado = transiciones[estado].get(caracter, 0)
+            if salidas[estado]:
+                yield salidas[estado]
+
+    def encontrados(self, texto):
+        """
+        Patrones distintos que aparecen en el texto.
+
+        Returns:
+            frozenset: Los patrones encontrados (cada uno cuenta una sola vez).
+        """
+        if self.ignorar_mayusculas:
+            texto = texto.lower()
+        if self._transiciones is None:
+            return frozenset(p for p in self.patrones if p in texto)
+        patrones = self.patrones
+        return frozenset(patrones[i] for salida in self._recorrer(texto) for i in salida)
+
+    def contiene(self, texto):
+        """True si aparece al menos uno de los patrones; corta en la primera coincidencia."""
+        if self.ignorar_mayusculas:
+            texto = texto.lower()
+        if self._transiciones is None:
+            return any(p in texto for p in self.patrones)
+        return next(self._recorrer(texto), None) is not None
+
+    def __len__(self):
+        return len(self.patrones)
+
+
+# Las palabras prohibidas se buscan sin distinguir mayúsculas; las secuencias, tal cual.
+# cargar_politica() los rearma con los patrones de los archivos de política.
+_AUTOMATA_PROHIBIDAS = AutomataPatrones(palabras_prohibidas, ignorar_mayusculas=True)
+_AUTOMATA_SECUENCIAS = AutomataPatrones(secuencias_no_recomendadas)
+PENALIZACION_SECUENCIA = 7
+
+
+def _leer_patrones(ruta):
+    """Lee un archivo de política: un patrón por línea; se ignoran las vacías y las que empiezan con '#'."""
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return [linea.rstrip("\r\n") for linea in f if linea.strip() and not linea.startswith("#")]
+    except OSError as e:
+        raise ArchivoNoAccesibleError(f"No se pudo abrir el archivo de política '{ruta}': {e}")
+
+
+def cargar_politica(prohibidas=None, secuencias=None, reemplazar=False):
+    """
+    Agrega palabras prohibidas y secuencias no recomendadas desde archivos de política.
+
+    Cada secuencia encontrada resta `PENALIZACION_SECUENCIA` puntos, igual que las
+    predeterminadas; las palabras prohibidas hacen inválida la contraseña.
+
+    Parámetros:
+        prohibidas: Archivo con palabras prohibidas (se comparan sin distinguir mayúsculas).
+        secuencias: Archivo con secuencias no recomendadas (se comparan tal cual).
+        reemplazar (bool, opcional): Si es True, reemplaza las listas predeterminadas en vez de ampliarlas.
+
+    Returns:
+        tupla: (cantidad de palabras prohibidas, cantidad de secuencias) vigentes.
+
+    Raises:
+        ArchivoNoAccesibleError: Si algún archivo no se puede leer.
+    """
+    global palabras_prohibidas, secuencias_no_recomendadas, _AUTOMATA_PROHIBIDAS, _AUTOMATA_SECUENCIAS
+    if prohibidas is not None:
+        nuevas = _leer_patrones(prohibidas)
+        palabras_prohibidas = tuple(nuevas) if reemplazar else palabras_prohibidas + tuple(nuevas)
+        _AUTOMATA_PROHIBIDAS = AutomataPatrones(palabras_prohibidas, ignorar_mayusculas=True)
+    if secuencias is not None:
+        nuevas = _leer_patrones(secuencias)
+        secuencias_no_recomendadas = tuple(nuevas) if reemplazar else secuencias_no_recomendadas + tuple(nuevas)
+        _AUTOMATA_SECUENCIAS = AutomataPatrones(secuencias_no_recomendadas)
+    return len(_AUTOMATA_PROHIBIDAS), len(_AUTOMATA_SECUENCIAS)
+
+# Grupos de caracteres en el orden del mapeo; la generación en lote los sortea con
+# `_tabla_ponderada`: cada grupo pesa 1/4, igual que en crear_contraseña.
+GRUPOS = (letras_mayusculas, letras_minusculas, numeros, caracteres_especiales)
+_GRUPOS_SET = tuple(frozenset(grupo) for grupo in GRUPOS)
+_GRUPO_DE = {caracter: indice for indice, grupo in enumerate(GRUPOS) for caracter in grupo}
+
+class _Colores(dict):
+    """
+    Códigos de color de la consola, cargados en el primer uso.
+
+    colorama solo se importa (e inicializa) si hay una terminal que los muestre; en
+    modo headless, con la salida redirigida o sin colorama instalado, todos los
+    colores son cadenas vacías.
+    """
+
+    CLAVES = ("ok", "error", "alerta", "info", "rosa", "reset", "bright")
+
+    def __getitem__(self, clave):
+        if not dict.__len__(self):
+            self._cargar()
+        return dict.__getitem__(self, clave)
+
+    def _cargar(self):
+        salida = sys.stdout
+        if HEADLESS or salida is None or not salida.isatty():
+            self.update(dict.fromkeys(self.CLAVES, ""))
+            return
+        try:
+            from colorama import Fore, Style, init #instalar colorama en la terminal con python3 install colorama 
+        except ImportError:
+            self.update(dict.fromkeys(self.CLAVES, ""))
+            return
+        init()
+        self.update({
+            "ok": Fore.GREEN,       
+            "error": Fore.RED,      
+            "alerta": Fore.YELLOW,  
+            "info": Fore.CYAN,     
+            "rosa":Fore.MAGENTA, 
+            "reset": Style.RESET_ALL,
+            "bright": Style.BRIGHT
+        })
+
+
+COLORES = _Colores()
+
+
+def activar_modo_headless():
+    """Desactiva los colores (y la carga de colorama) para el resto de la ejecución."""
+    global HEADLESS
+    HEADLESS = True
+    COLORES.clear()
+
+
+limpiar_pantalla = lambda: os.system("cls") if os.name=="nt" else os.system("clear")
+
+
+# ==== Almacenes de credenciales ====
+
+class AlmacenCSV:
+    """
+    Almacén histórico: un archivo `<usuario>.csv` por administrador.
+
+    La primera línea de cada archivo guarda la contraseña como 'enc;lista' (o en texto
+    plano en archivos antiguos).
+
+    Parámetros:
+        directorio (str, opcional): Carpeta de los archivos. Por defecto la actual.
+    """
+
+    def __init__(self, directorio="."):
+        self.directorio = directorio
+        # Identifica los datos (no el objeto): dos almacenes sobre la misma carpeta comparten caché
+        self.identidad = ("csv", os.path.abspath(directorio))
+
+    def _ruta(self, usuario):
+        return os.path.join(self.directorio, f"{usuario}.csv")
+
+    def leer(self, usuario):
+        """Devuelve la línea guardada del usuario, o None si no existe (o no se puede leer)."""
+        try:
+            with open(self._ruta(usuario), mode="rt", encoding="utf-8") as archivo:
+                linea = archivo.readline()
+        except OSError:
+            return None
+        if _perfilador is not None:
+            _perfilador.sumar_bytes("AlmacenCSV.leer", leidos=len(linea.encode("utf-8")))
+        return linea.strip()
+
+    def version(self, usuario):
+        """Marca de modificación del archivo del usuario (mtime en ns), o None si no existe."""
+        try:
+            return os.stat(self._ruta(usuario)).st_mtime_ns
+        except OSError:
+            return None
+
+    def crear(self, usuario, valor):
+        """
+        Crea el usuario de forma atómica.
+
+        La línea se escribe en un archivo temporal que después se enlaza (`os.link`) como
+        `<usuario>.csv`: el enlace falla si el usuario ya existe y nunca reemplaza un
+        archivo, y nadie llega a ver el archivo del usuario vacío o a medio escribir.
+
+        Returns:
+            bool: False si el usuario ya existía.
+
+        Raises:
+            ArchivoNoAccesibleError: Si no se puede escribir el archivo.
+        """
+        ruta = self._ruta(usuario)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            try:
+                with open(temporal, mode="wt", encoding="utf-8") as archivo:
+                    archivo.write(f"{valor}\n")
+                os.link(temporal, ruta)
+            finally:
+                try:
+                    os.remove(temporal)
+                except OSError:
+                    pass
+        except FileExistsError:
+            return False
+        except OSError as e:
+            raise ArchivoNoAccesibleError(f"No se pudo crear el archivo de '{usuario}': {e}")
+        if _perfilador is not None:
+            _perfilador.sumar_bytes("AlmacenCSV.crear", escritos=len(valor.encode("utf-8")) + 1)
+        if _cache_credenciales is not None:
+            _cache_credenciales.invalidar(self, usuario)
+        return True
+
+    def actualizar(self, usuario, valor):
+        """
+        Reemplaza la línea del usuario (archivo temporal + rename).
+
+        Raises:
+            ArchivoNoAccesibleError: Si no se puede escribir el archivo.
+        """
+        ruta = self._ruta(usuario)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, mode="wt", encoding="utf-8") as archivo:
+                archivo.write(f"{valor}\n")
+            os.replace(temporal, ruta)
+            if _perfilador is not None:
+                _perfilador.sumar_bytes("AlmacenCSV.actualizar", escritos=len(valor.encode("utf-8")) + 1)
+            if _cache_credenciales is not None:
+                _cache_credenciales.invalidar(self, usuario)
+        except OSError as e:
+            raise ArchivoNoAccesibleError(f"No se pudo actualizar el archivo de '{usuario}': {e}")
+
+    def leer_historial(self, usuario):
+        """Devuelve el historial de contraseñas del usuario (`<usuario>.historial`, bytes), o None si no tiene."""
+        try:
+            with open(os.path.join(self.directorio, f"{usuario}.historial"), mode="rb") as archivo:
+                return archivo.read()
+        except OSError:
+            return None
+
+    def guardar_historial(self, usuario, datos):
+        """
+        Reemplaza el historial de contraseñas del usuario (archivo temporal + rename).
+
+        Raises:
+            ArchivoNoAccesibleError: Si no se puede escribir el archivo.
+        """
+        ruta = os.path.join(self.directorio, f"{usuario}.historial")
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        try:
+            with open(temporal, mode="wb") as archivo:
+                archivo.write(datos)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            raise ArchivoNoAccesibleError(f"No se pudo guardar el historial de '{usuario}': {e}")
+
+    def usuarios(self):
+        """Lista los usuarios con archivo propio (excluye logs de eventos)."""
+        usuarios = []
+        for ruta in sorted(glob.glob(os.path.join(glob.escape(self.directorio), "*.csv"))):
+            try:
+                with open(ruta, mode="rt", encoding="utf-8") as archivo:
+                    if archivo.readline() == ENCABEZADO_LOG:
+                        continue
+            except (OSError, UnicodeDecodeError):
+                continue
+            usuarios.append(os.path.basename(ruta)[:-len(".csv")])
+        return usuarios
+
+
+class AlmacenSQLite:
+    """
+    Almacén de credenciales en un único archivo SQLite, con índice por usuario.
+
+    Cada operación es una transacción, así que crear y actualizar son atómicos. Se
+    puede compartir entre hilos.
+
+    Parámetros:
+        ruta (str, opcional): Archivo de la base. Por defecto 'credenciales.db'.
+    """
+
+    def __init__(self, ruta="credenciales.db"):
+        import sqlite3     # se importa solo si hace falta
+        self.ruta = ruta
+        self.identidad = ("sqlite", os.path.abspath(ruta))
+        self._lock = threading.Lock()
+        try:
+            self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+            with self._conexion:
+                self._conexion.execute("PRAGMA journal_mode=WAL")
+                self._conexion.execute(
+                    "CREATE TABLE IF NOT EXISTS credenciales (usuario TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+                self._conexion.execute(
+                    "CREATE TABLE IF NOT EXISTS historial (usuario TEXT PRIMARY KEY, datos BLOB NOT NULL)")
+        except sqlite3.Error as e:
+            raise ArchivoNoAccesibleError(f"No se pudo abrir la base de credenciales '{ruta}': {e}")
+
+    def leer(self, usuario):
+        """Devuelve la línea guardada del usuario, o None si no existe."""
+        import sqlite3
+        with self._lock:
+            try:
+                fila = self._conexion.execute(
+                    "SELECT valor FROM credenciales WHERE usuario = ?", (usuario,)).fetchone()
+            except sqlite3.Error as e:
+                raise ArchivoNoAccesibleError(f"No se pudo leer la base de credenciales: {e}")
+        if fila is None:
+            return None
+        if _perfilador is not None:
+            _perfilador.sumar_bytes("AlmacenSQLite.leer", leidos=len(fila[0].encode("utf-8")))
+        return fila[0]
+
+    def version(self, usuario):
+        """Sin marca de modificación barata por usuario: la caché se apoya en el TTL y en la invalidación al escribir."""
+        return None
+
+    def crear(self, usuario, valor):
+        """
+        Crea el usuario de forma atómica.
+
+        Returns:
+            bool: False si el usuario ya existía.
+
+        Raises:
+            ArchivoNoAccesibleError: Si no se puede escribir la base.
+        """
+        import sqlite3
+        with self._lock:
+            try:
+                with self._conexion:
+                    cursor = self._conexion.execute(
+                        "INSERT OR IGNORE INTO credenciales (usuario, valor) VALUES (?, ?)", (usuario, valor))
+            except sqlite3.Error as e:
+                raise ArchivoNoAccesibleError(f"No se pudo escribir la base de credenciales: {e}")
+        if _perfilador is not None and cursor.rowcount == 1:
+            _perfilador.sumar_bytes("AlmacenSQLite.crear", escritos=len(valor.encode("utf-8")))
+        if _cache_credenciales is not None:
+            _cache_credenciales.invalidar(self, usuario)
+        return cursor.rowcount == 1
+
+    def actualizar(self, usuario, valor):
+        """
+        Crea o reemplaza la línea del usuario.
+
+        Raises:
+            ArchivoNoAccesibleError: Si no se puede escribir la base.
+        """
+        import sqlite3
+        with self._lock:
+            try:
+                with self._conexion:
+                    self._conexion.execute(
+                        "INSERT OR REPLACE INTO credenciales (usuario, valor) VALUES (?, ?)", (usuario, valor))
+            except sqlite3.Error as e:
+                raise ArchivoNoAccesibleError(f"No se pudo escribir la base de credenciales: {e}")
+        if _perfilador is not None:
+            _perfilador.sumar_bytes("AlmacenSQLite.actualizar", escritos=len(valor.encode("utf-8")))
+        if _cache_credenciales is not None:
+            _cache_credenciales.invalidar(self, usuario)
+
+    def leer_historial(self, usuario):
+        """
+        Devuelve el historial de contraseñas del usuario (bytes), o None si no tiene.
+
+        Raises:
+            ArchivoNoAccesibleError: Si no se puede leer la base.
+        """
+        import sqlite3
+        with self._lock:
+            try:
+                fila = self._conexion.execute("SELECT datos FROM historial WHERE usuario = ?", (usuario,)).fetchone()
+            except sqlite3.Error as e:
+                raise ArchivoNoAccesibleError(f"No se pudo leer la base de credenciales: {e}")
+        return bytes(fila[0]) if fila is not None else None
+
+    def guardar_historial(self, usuario, datos):
+        """
+        Crea o reemplaza el historial de contraseñas del usuario.
+
+        Raises:
+            ArchivoNoAccesibleError: Si no se puede escribir la base.
+        """
+        import sqlite3
+        with self._lock:
+            try:
+                with self._conexion:
+                    self._conexion.execute(
+                        "INSERT OR REPLACE INTO historial (usuario, datos) VALUES (?, ?)", (usuario, datos))
+            except sqlite3.Error as e:
+                raise ArchivoNoAccesibleError(f"No se pudo escribir la base de credenciales: {e}")
+
+    def usuarios(self):
+        """Lista los usuarios guardados, ordenados."""
+        with self._lock:
+            return [fila[0] for fila in self._conexion.execute("SELECT usuario FROM credenciales ORDER BY usuario")]
+
+    def importar_csv(self, directorio="."):
+        """
+        Migra de una vez los archivos `<usuario>.csv` de un directorio a la base.
+
+        Los usuarios que ya estén en la base no se pisan. También se copian los
+        historiales de contraseñas (`<usuario>.historial`). Todo se inserta en una sola
+        transacción.
+
+        Parámetros:
+            directorio (str, opcional): Carpeta de los archivos. Por defecto la actual.
+
+        Returns:
+            tupla: (migrados, ya_existentes)
+        """
+        import sqlite3
+        origen = AlmacenCSV(directorio)
+        filas = []
+        historiales = []
+        for usuario in origen.usuarios():
+            valor = origen.leer(usuario)
+            if valor:
+                filas.append((usuario, valor))
+                historial = origen.leer_historial(usuario)
+                if historial is not None:
+                    historiales.append((usuario, historial))
+        with self._lock:
+            try:
+                with self._conexion:
+                    antes = self._conexion.total_changes
+                    self._conexion.executemany(
+                        "INSERT OR IGNORE INTO credenciales (usuario, valor) VALUES (?, ?)", filas)
+                    migrados = self._conexion.total_changes - antes
+                    self._conexion.executemany(
+                        "INSERT OR IGNORE INTO historial (usuario, datos) VALUES (?, ?)", historiales)
+            except sqlite3.Error as e:
+                raise ArchivoNoAccesibleError(f"No se pudo escribir la base de credenciales: {e}")
+        if _cache_credenciales is not None:
+            _cache_credenciales.invalidar(self)
+        return migrados, len(filas) - migrados
+
+    def cerrar(self):
+        """Cierra la conexión con la base."""
+        with self._lock:
+            self._conexion.close()
+
+
+# Almacén que usa login(); `python pass_logic.py --db credenciales.db` lo cambia por SQLite
+ALMACEN_CREDENCIALES = AlmacenCSV()
+
+HISTORIAL_MAXIMO = 5    # contraseñas que recuerda HistorialContraseñas
+
+
+class HistorialContraseñas:
+    """
+    Últimas contraseñas de un usuario, para no permitir que las reutilice.
+
+    No guarda las contraseñas ni su forma 'enc;lista': solo un digesto PBKDF2-SHA256
+    de 32 bytes por contraseña, con una sal aleatoria por usuario, uno detrás de otro
+    en un `bytearray` (a lo sumo `maximo`, se descartan los más viejos). Comprobar una
+    contraseña calcula un solo digesto y lo compara en tiempo constante con todas las
+    entradas, sin cortar en la primera coincidencia.
+
+    Se guarda en el almacén junto a las credenciales (`<usuario>.historial` o la tabla
+    `historial` de SQLite) y se lee recién la primera vez que se consulta.
+
+    Parámetros:
+        usuario: Nombre del usuario.
+        almacen (opcional): Almacén de credenciales. Por omisión `ALMACEN_CREDENCIALES`.
+        maximo (int, opcional): Contraseñas recordadas. Por defecto `HISTORIAL_MAXIMO` (5).
+        iteraciones (int, opcional): Iteraciones de PBKDF2 para los historiales nuevos. Por defecto 100000.
+    """
+
+    MAGIA = b"PLHIST1\n"
+    _ENCABEZADO = struct.Struct("<IH")     # iteraciones, cantidad de digestos
+    TAMAÑO_SAL = 16
+    TAMAÑO_DIGESTO = 32
+
+    def __init__(self, usuario, almacen=None, maximo=None, iteraciones=100000):
+        self.usuario = usuario
+        self.almacen = almacen
+        self.maximo = HISTORIAL_MAXIMO if maximo is None else maximo
+        self.iteraciones = iteraciones
+        self._cargado = False
+        self._sal = None
+        self._digestos = bytearray()
+
+    def _almacen(self):
+        return self.almacen if self.almacen is not None else ALMACEN_CREDENCIALES
+
+    def _cargar(self):
+        self._cargado = True
+        datos = self._almacen().leer_historial(self.usuario)
+        if not datos:
+            return
+        inicio = len(self.MAGIA) + self._ENCABEZADO.size
+        if datos[:len(self.MAGIA)] != self.MAGIA or len(datos) < inicio + self.TAMAÑO_SAL:
+            return      # historial dañado: se empieza de nuevo
+        iteraciones, cantidad = self._ENCABEZADO.unpack_from(datos, len(self.MAGIA))
+        self.iteraciones = iteraciones
+        self._sal = datos[inicio:inicio + self.TAMAÑO_SAL]
+        inicio += self.TAMAÑO_SAL
+        self._digestos = bytearray(datos[inicio:inicio + cantidad * self.TAMAÑO_DIGESTO])
+
+    def _digesto(self, contraseña):
+        import hashlib     # se importa solo si hace falta
+        return hashlib.pbkdf2_hmac("sha256", contraseña.encode("utf-8"), self._sal, self.iteraciones)
+
+    def __len__(self):
+        if not self._cargado:
+            self._cargar()
+        return len(self._digestos) // self.TAMAÑO_DIGESTO
+
+    def contiene(self, contraseña):
+        """True si la contraseña está entre las últimas `maximo` del usuario."""
+        import hmac
+        if not self._cargado:
+            self._cargar()
+        if not self._digestos:
+            return False
+        digesto = self._digesto(contraseña)
+        vista = memoryview(self._digestos)
+        usada = False
+        for inicio in range(0, len(vista), self.TAMAÑO_DIGESTO):
+            usada |= hmac.compare_digest(vista[inicio:inicio + self.TAMAÑO_DIGESTO], digesto)
+        return usada
+
+    def agregar(self, contraseña):
+        """
+        Agrega la contraseña al historial y lo guarda en el almacén.
+
+        Raises:
+            ArchivoNoAccesibleError: Si no se puede guardar.
+        """
+        if not self._cargado:
+            self._cargar()
+        if self._sal is None:
+            self._sal = os.urandom(self.TAMAÑO_SAL)
+        self._digestos += self._digesto(contraseña)
+        sobrante = len(self._digestos) - self.maximo * self.TAMAÑO_DIGESTO
+        if sobrante > 0:
+            del self._digestos[:sobrante]
+        datos = (self.MAGIA + self._ENCABEZADO.pack(self.iteraciones, len(self._digestos) // self.TAMAÑO_DIGESTO)
+                 + self._sal + self._digestos)
+        self._almacen().guardar_historial(self.usuario, bytes(datos))
+
+    def iniciar(self, contraseña):
+        """
+        Empieza un historial nuevo con una sola contraseña (cuenta recién creada).
+
+        Descarta lo que haya quedado de una cuenta anterior con el mismo nombre, que
+        era de otra persona.
+
+        Raises:
+            ArchivoNoAccesibleError: Si no se puede guardar.
+        """
+        self._cargado = True
+        self._sal = None
+        self._digestos = bytearray()
+        self.agregar(contraseña)
+
+
+class CacheCredenciales:
+    """
+    Caché acotada (LRU + TTL) de contraseñas ya desencriptadas, por almacén y usuario.
+
+    Un acierto evita leer el almacén y desencriptar. Una entrada deja de valer cuando
+    vence su TTL, cuando cambia la versión del usuario en el almacén (mtime del
+    `<usuario>.csv`) o cuando se escribe el usuario a través del almacén (crear,
+    actualizar, importar_csv). Es segura entre hilos: cada invalidación sube un
+    contador de generación por usuario (y otro por almacén), y `guardar` no acepta
+    un valor leído antes de una invalidación, así una lectura lenta no deja en
+    caché una contraseña vieja.
+
+    Parámetros:
+        capacidad (int, opcional): Usuarios máximos en memoria. Por defecto 1024.
+        ttl (float, opcional): Segundos de validez de cada entrada. Por defecto 60.
+    """
+
+    def __init__(self, capacidad=1024, ttl=60.0):
+        self.capacidad = capacidad
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entradas = OrderedDict()     # (identidad del almacén, usuario) -> (contraseña, version, vence)
+        self._generaciones = {}            # (identidad, usuario) o (identidad, None) -> invalidaciones
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+
+    def obtener(self, almacen, usuario, version):
+        """Devuelve la contraseña en caché, o None si no está o ya no vale."""
+        clave = (almacen.identidad, usuario)
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[2] > time.monotonic() and entrada[1] == version:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return entrada[0]
+            if entrada is not None:
+                del self._entradas[clave]
+            self.fallos += 1
+            return None
+
+    def generacion(self, almacen, usuario):
+        """Generación actual de un usuario; se toma antes de leer el almacén y se pasa a `guardar`."""
+        identidad = almacen.identidad
+        with self._lock:
+            return self._generaciones.get((identidad, usuario), 0), self._generaciones.get((identidad, None), 0)
+
+    def guardar(self, almacen, usuario, version, contraseña, generacion=None):
+        """
+        Guarda la contraseña desencriptada, desalojando la menos usada si hace falta.
+
+        Parámetros:
+            generacion (tuple, opcional): Lo que devolvió `generacion()` antes de leer el almacén.
+                Si el usuario se invalidó desde entonces, no se guarda nada.
+
+        Returns:
+            bool: True si quedó guardada.
+        """
+        clave = (almacen.identidad, usuario)
+        with self._lock:
+            if generacion is not None and generacion != (self._generaciones.get(clave, 0),
+                                                         self._generaciones.get((clave[0], None), 0)):
+                return False
+            self._entradas[clave] = (contraseña, version, time.monotonic() + self.ttl)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.capacidad:
+                self._entradas.popitem(last=False)
+                self.desalojos += 1
+            return True
+
+    def invalidar(self, almacen, usuario=None):
+        """Descarta la entrada de un usuario, o todas las del almacén si no se indica usuario."""
+        with self._lock:
+            generacion = (almacen.identidad, usuario)
+            self._generaciones[generacion] = self._generaciones.get(generacion, 0) + 1
+            if usuario is not None:
+                clave = (almacen.identidad, usuario)
+                claves = [clave] if clave in self._entradas else []
+            else:
+                claves = [clave for clave in self._entradas if clave[0] == almacen.identidad]
+            for clave in claves:
+                del self._entradas[clave]
+            self.invalidaciones += len(claves)
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: tamaño, capacidad, aciertos, fallos, tasa_aciertos, desalojos e invalidaciones.
+        """
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {"tamaño": len(self._entradas), "capacidad": self.capacidad, "aciertos": self.aciertos,
+                    "fallos": self.fallos, "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                    "desalojos": self.desalojos, "invalidaciones": self.invalidaciones}
+
+
+def activar_cache_credenciales(capacidad=1024, ttl=60.0):
+    """
+    Activa la caché de contraseñas desencriptadas que usan `leer_contraseña_guardada` y `login()`.
+
+    Parámetros:
+        capacidad (int, opcional): Usuarios máximos en memoria. Por defecto 1024.
+        ttl (float, opcional): Segundos de validez de cada entrada. Por defecto 60.
+
+    Returns:
+        CacheCredenciales: La caché activa (con sus contadores de aciertos y fallos).
+    """
+    global _cache_credenciales
+    _cache_credenciales = CacheCredenciales(capacidad, ttl)
+    return _cache_credenciales
 
-COLORES = {
-    "ok": Fore.GREEN,       
-    "error": Fore.RED,      
-    "alerta": Fore.YELLOW,  
-    "info": Fore.CYAN,     
-    "rosa":Fore.MAGENTA, 
-    "reset": Style.RESET_ALL,
-    "bright": Style.BRIGHT
-}
 
-limpiar_pantalla = lambda: os.system("cls") if platform.system()=="Windows" else os.system("clear")
+def desactivar_cache_credenciales():
+    """Desactiva la caché y descarta su contenido."""
+    global _cache_credenciales
+    _cache_credenciales = None
 
 
-def login():    
+def login(almacen=None):    
     """
     Inicia sesión o crea un nuevo usuario administrador.
 
@@ -106,13 +1656,16 @@ def login():
         - Si existe, valida la contraseña (con 3 intentos).
         - Si no existe, ofrece crear una nueva cuenta con validación de contraseña.
 
+    Parámetros:
+        almacen: Almacén de credenciales (`AlmacenCSV`, `AlmacenSQLite`). Por omisión `ALMACEN_CREDENCIALES`.
+
     Returns:
         tupla: (usuario, contraseña)
 
     Raises:
         UsuarioNoExisteError: Si el usuario no existe y elige no crear cuenta.
         CredencialesInvalidasError: Si falla la validación o se exceden intentos.
-        ArchivoNoAccesibleError: Si no se puede crear el archivo del nuevo usuario.
+        ArchivoNoAccesibleError: Si no se puede guardar el nuevo usuario.
     """
     
     print(COLORES["bright"] + "\n══════════════ LOGIN ══════════════" + COLORES["reset"])
@@ -122,42 +1675,31 @@ def login():
         if user:
             break
         print(COLORES["alerta"]+"⚠ Debe ingresar un nombre de usuario."+ COLORES["reset"])
-    archivo_usuario = f"{user}.csv"
+    if almacen is None:
+        almacen = ALMACEN_CREDENCIALES
+    contraseña_guardada = leer_contraseña_guardada(user, almacen)
+
+    if contraseña_guardada is not None:
+        #Hasta 3 intentos de ingreso
+        intentos=3
+
+        while intentos>0:
+            contraseña_ingresada = input(COLORES["bright"]+"🔐 Contraseña: "+COLORES["reset"])
         
-    try:
-        with open(archivo_usuario, mode="rt", encoding="utf-8") as archivo:
-            contraseña_archivada= archivo.readline().strip()
-            #Intentamos desencriptar si tiene formato encriptado.
-            if ";" in contraseña_archivada:
-                try:
-                    enc, lista = contraseña_archivada.split(";", 1)
-                    contraseña_guardada = desencriptar(enc, enlistar(lista))
-                except Exception:
-                    raise CredencialesInvalidasError(COLORES["error"]+"✖ Error al desencriptar la contraseña guardada."+ COLORES["reset"])
-                   
+            if contraseña_ingresada == contraseña_guardada:
+                print(COLORES["bright"]+f"\nBienvenido, {user}!"+COLORES["reset"])
+                return user, contraseña_guardada
             else:
-                contraseña_guardada= contraseña_archivada
-                
-            #Hasta 3 intentos de ingreso
-            intentos=3
-
-            while intentos>0:
-                contraseña_ingresada = input(COLORES["bright"]+"🔐 Contraseña: "+COLORES["reset"])
-            
-                if contraseña_ingresada == contraseña_guardada:
-                    print(COLORES["bright"]+f"\nBienvenido, {user}!"+COLORES["reset"])
-                    return user, contraseña_guardada
+                intentos-=1
+                if intentos>0:
+                    print(COLORES["error"]+ "✖ Contraseña incorrecta."+ COLORES["reset"])
                 else:
-                    intentos-=1
-                    if intentos>0:
-                        print(COLORES["error"]+ "✖ Contraseña incorrecta."+ COLORES["reset"])
-                    else:
-                        log_event("login_attempts_exceeded", "WARN", "Excediste los 3 intentos.", usuario=user, funcion="login")
-                        raise CredencialesInvalidasError(COLORES["error"]+ "Excediste los 3 intentos."+ COLORES["reset"])
-                     
+                    log_event("login_attempts_exceeded", "WARN", "Excediste los 3 intentos.", usuario=user, funcion="login")
+                    raise CredencialesInvalidasError("Excediste los 3 intentos.")
+                 
 
         
-    except OSError:
+    else:
         
         #Usuario no encontrado -> ofrece crearlo
         print(COLORES["alerta"] + f"⚠ El usuario '{user}' no existe." + COLORES["reset"])
@@ -167,7 +1709,7 @@ def login():
             respuesta = input(COLORES["alerta"]+"✖ Respuesta INVALIDA, debe ingresar s o n: "+COLORES["reset"]).lower()
         
         if respuesta == "n":
-            raise UsuarioNoExisteError(COLORES["alerta"] + "⚠ No se creó el usuario. Saliendo del login."+ COLORES["reset"])
+            raise UsuarioNoExisteError("⚠ No se creó el usuario. Saliendo del login.")
           
 
         print("Creando nueva cuenta...")
@@ -188,31 +1730,200 @@ def login():
                 continue        
 
         try:
-            enc, lista = encriptar(nuevaContraseña)
+            enc, lista = encriptar(nuevaContraseña, LISTA_COMPACTA, POZO_ENTROPIA)
+            creado = almacen.crear(user, f"{enc};{lista}")
+        except ArchivoNoAccesibleError as e:
+            raise ArchivoNoAccesibleError(f"❌ No se pudo crear el archivo: {e}") from e
+        if not creado:
+            # Otro proceso lo creó mientras se elegía la contraseña
+            raise ArchivoNoAccesibleError(f"❌ El usuario '{user}' ya existe.")
+        try:
+            # Cuenta nueva: un `.historial` que haya quedado de una cuenta borrada no se hereda
+            HistorialContraseñas(user, almacen).iniciar(nuevaContraseña)
+        except ArchivoNoAccesibleError as e:
+            # La cuenta ya está creada: sin historial solo se pierde el control de reutilización
+            log_event("io_error", "WARN", str(e), usuario=user, funcion="login")
 
-            with open(archivo_usuario, mode = "wt", encoding="utf-8") as archivo:
-                archivo.write(f"{enc};{lista}\n")
-            print(COLORES["ok"]+"✅ Cuenta creada exitosamente!"+ COLORES["reset"])
-            print(COLORES["bright"]+f"\nBienvenido, {user}!"+COLORES["reset"])
-            return user, nuevaContraseña
-        
-        except OSError:
-            raise ArchivoNoAccesibleError(COLORES["error"]+"❌ No se pudo crear el archivo"+COLORES["reset"])
+        print(COLORES["ok"]+"✅ Cuenta creada exitosamente!"+ COLORES["reset"])
+        print(COLORES["bright"]+f"\nBienvenido, {user}!"+COLORES["reset"])
+        return user, nuevaContraseña
            
             
     
 
-    
-def crear_contraseña(largo_contraseña = 20):
+    
+def leer_contraseña_guardada(usuario, almacen=None):
+    """
+    Busca la contraseña guardada de un usuario y la desencripta, sin interacción.
+
+    Es el núcleo de `login()` sin input(): lo usa también el servidor de autenticación (`servidor_auth.py`).
+    Con `activar_cache_credenciales()` los accesos repetidos no leen el almacén ni desencriptan.
+
+    Parámetros:
+        usuario: Nombre del usuario administrador.
+        almacen: Almacén de credenciales. Por omisión `ALMACEN_CREDENCIALES`.
+
+    Returns:
+        str | None: Contraseña en texto plano, o None si el usuario no existe.
+
+    Raises:
+        CredencialesInvalidasError: Si la contraseña guardada está vacía (archivo truncado o
+            a medio crear) o no se puede desencriptar.
+    """
+    if almacen is None:
+        almacen = ALMACEN_CREDENCIALES
+
+    cache = _cache_credenciales
+    if cache is not None:
+        # Generación y versión se toman antes de leer: si el usuario cambia en el medio,
+        # `guardar` rechaza el valor viejo o el próximo acceso lo nota
+        generacion = cache.generacion(almacen, usuario)
+        version = almacen.version(usuario)
+        contraseña = cache.obtener(almacen, usuario, version)
+        if contraseña is not None:
+            return contraseña
+
+    contraseña_archivada = almacen.leer(usuario)
+
+    #Intentamos desencriptar si tiene formato encriptado.
+    if contraseña_archivada is None or ";" not in contraseña_archivada:
+        contraseña = contraseña_archivada
+    else:
+        try:
+            enc, lista = contraseña_archivada.split(";", 1)
+            contraseña = desencriptar(enc, lista)     # detecta el formato de la lista
+        except Exception:
+            raise CredencialesInvalidasError("✖ Error al desencriptar la contraseña guardada.")
+    if contraseña == "":
+        # Una línea vacía nunca es una contraseña válida: no debe aceptar un ingreso vacío
+        raise CredencialesInvalidasError("✖ La contraseña guardada está vacía.")
+
+    if cache is not None and contraseña is not None:
+        cache.guardar(almacen, usuario, version, contraseña, generacion)
+    return contraseña
+
+
+# ==== Fuentes de aleatoriedad para generar y encriptar ====
+
+def _tabla_ponderada(grupos):
+    """
+    Cada caracter repetido según su peso: un índice uniforme sobre la tabla equivale a
+    sortear primero el grupo (todos igual de probables) y después el caracter dentro del grupo.
+    """
+    mcm = math.lcm(*(len(grupo) for grupo in grupos))
+    return "".join(caracter * (mcm // len(grupo)) for grupo in grupos for caracter in grupo)
+
+
+class PozoEntropia:
+    """
+    Fuente criptográficamente segura y con buffer para `crear_contraseña` y `encriptar`.
+
+    Lee `os.urandom` en bloques grandes y convierte cada par de bytes en un caracter
+    por muestreo con rechazo (se descartan los valores del último tramo incompleto), así
+    que la distribución es exactamente la de `crear_contraseña`, sin sesgo de módulo.
+    Cada hilo tiene su propio buffer (no hay locks) y tras un `fork` el proceso hijo
+    descarta el heredado.
+
+    Parámetros:
+        tamaño_bloque (int, opcional): Bytes leídos de `os.urandom` por recarga. Por defecto 16384.
+        grupos (opcional): Tuplas de caracteres. Por omisión `GRUPOS`.
+    """
+
+    def __init__(self, tamaño_bloque=16384, grupos=GRUPOS):
+        self.grupos = tuple(grupos)
+        self.tamaño_bloque = tamaño_bloque - tamaño_bloque % 2
+        self._tabla = _tabla_ponderada(self.grupos)
+        if len(self._tabla) > 1 << 16:
+            raise EntradaInvalidaError("Demasiados caracteres para sortear con 16 bits.")
+        # Valores de 16 bits desde este límite se rechazan: el resto se reparte parejo en la tabla
+        self._limite = (1 << 16) // len(self._tabla) * len(self._tabla)
+        self._local = threading.local()
+
+    def _rellenar(self):
+        tabla = self._tabla
+        total = len(tabla)
+        limite = self._limite
+        valores = memoryview(os.urandom(self.tamaño_bloque)).cast("H")
+        return "".join([tabla[v % total] for v in valores if v < limite])
+
+    def caracteres(self, cantidad):
+        """Devuelve `cantidad` caracteres aleatorios (str)."""
+        estado = self._local
+        pid = os.getpid()
+        if getattr(estado, "pid", None) != pid:
+            estado.pid, estado.buffer, estado.posicion = pid, "", 0
+        buffer, posicion = estado.buffer, estado.posicion
+        if len(buffer) - posicion < cantidad:
+            partes = [buffer[posicion:]]
+            disponibles = len(partes[0])
+            while disponibles < cantidad:
+                partes.append(self._rellenar())
+                disponibles += len(partes[-1])
+            buffer, posicion = "".join(partes), 0
+            estado.buffer = buffer
+        estado.posicion = posicion + cantidad
+        return buffer[posicion:posicion + cantidad]
+
+
+class FuenteRandom:
+    """
+    Fuente sobre el módulo `random` global: la que usan `iterar_contraseñas` y
+    `CodificadorClaves.codificar_muchos` cuando no reciben `rng`.
+
+    Sortea índices uniformes sobre la tabla ponderada con `random.choices`, así que
+    `random.seed` sigue fijando sus resultados. No es segura para contraseñas reales.
+
+    Parámetros:
+        grupos (opcional): Tuplas de caracteres. Por omisión `GRUPOS`.
+    """
+
+    def __init__(self, grupos=GRUPOS):
+        self.grupos = tuple(grupos)
+        self._tabla = _tabla_ponderada(self.grupos)
+        self._random = random
+
+    def caracteres(self, cantidad):
+        """Devuelve `cantidad` caracteres aleatorios (str)."""
+        return "".join(self._random.choices(self._tabla, k=cantidad))
+
+
+class GeneradorDeterminista(FuenteRandom):
+    """
+    Fuente reproducible para pruebas y benchmarks: con la misma semilla produce los mismos caracteres.
+
+    Igual que `FuenteRandom` pero con su propio `random.Random`, así que no depende ni
+    altera el estado global de `random`. No es segura para contraseñas reales, y
+    compartida entre hilos deja de ser reproducible (conviene una por hilo).
+
+    Parámetros:
+        semilla (opcional): Semilla de `random.Random`.
+        grupos (opcional): Tuplas de caracteres. Por omisión `GRUPOS`.
+    """
+
+    def __init__(self, semilla=None, grupos=GRUPOS):
+        super().__init__(grupos)
+        self._random = random.Random(semilla)
+
+
+# Fuente segura compartida (un buffer por hilo) para las contraseñas del modo interactivo
+POZO_ENTROPIA = PozoEntropia()
+# Fuente por omisión de la generación en lote (módulo `random`)
+FUENTE_RANDOM = FuenteRandom()
+
+
+def crear_contraseña(largo_contraseña = 20, rng=None):
     """
     Genera una contraseña aleatoria cumpliendo los requisitos mínimos de seguridad.
 
     Parámetros:
         largo_contraseña: Longitud deseada. Por omisión 20.
+        rng: Fuente de aleatoriedad (`PozoEntropia`, `GeneradorDeterminista`). Por omisión el módulo `random`.
 
     Returns:
         str: Contraseña generada aleatoriamente.
     """
+    if rng is not None:
+        return rng.caracteres(largo_contraseña)
     contraseña=[]
     for i in range(largo_contraseña):
         buscar_lista = random.randint(0,3)
@@ -229,54 +1940,294 @@ def crear_contraseña(largo_contraseña = 20):
     return contraseña
 
 
-def validar(contraseña, largo_min=12):
+def crear_contraseñas(cantidad, largo_contraseña=20, rng=None):
     """
-    Verifica que la contraseña cumpla con los requisitos mínimos de seguridad.
+    Genera muchas contraseñas aleatorias en una sola llamada.
 
     Parámetros:
-        contraseña: Contraseña a validar.
-        largo_min: Longitud mínima requerida (por omisión 12).
+        cantidad: Número de contraseñas a generar.
+        largo_contraseña: Longitud de cada contraseña. Por omisión 20 (mínimo 4).
+        rng: Fuente de aleatoriedad (ver `crear_contraseña`). Por omisión el módulo `random`.
 
     Returns:
-        bool: True si cumple con todos los criterios.
+        list: Contraseñas generadas (ver `iterar_contraseñas`).
 
     Raises:
-        ContraseñaInvalidaError: Si falta algún requisito.
+        EntradaInvalidaError: Si la cantidad es negativa o el largo no alcanza para los 4 grupos.
     """
-    
+    return list(iterar_contraseñas(cantidad, largo_contraseña, rng=rng))
+
+
+# Rechazos seguidos del filtro de Bloom tras los que iterar_contraseñas se rinde
+MAX_RECHAZOS_FILTRO = 1000
+
+
+def iterar_contraseñas(cantidad, largo_contraseña=20, lote=1024, rng=None):
+    """
+    Generador de contraseñas aleatorias que sortea los caracteres por lotes.
+
+    Cada lote se sortea con una sola llamada a la fuente (`rng`, o `FUENTE_RANDOM`),
+    en lugar de dos `random.randint` por caracter. Solo se entregan
+    contraseñas con al menos una mayúscula, una minúscula, un número y un caracter
+    especial, sin palabras prohibidas y fuera del filtro de contraseñas cargado: con
+    un largo de al menos 12, `validar` acepta todas, sin que el llamador tenga que
+    reintentar.
+
+    Parámetros:
+        cantidad: Número de contraseñas a generar.
+        largo_contraseña: Longitud de cada contraseña. Por omisión 20 (mínimo 4).
+        lote: Cantidad de contraseñas que se sortean juntas. Por omisión 1024.
+        rng: Fuente de aleatoriedad (ver `crear_contraseña`). Por omisión el módulo `random`.
+
+    Yields:
+        str: Una contraseña por vez.
+
+    Raises:
+        EntradaInvalidaError: Si la cantidad es negativa, el largo no alcanza para los 4 grupos
+            o el filtro de contraseñas cargado rechaza prácticamente todo.
+    """
+    if cantidad < 0:
+        raise EntradaInvalidaError("La cantidad de contraseñas no puede ser negativa.")
+    if largo_contraseña < len(GRUPOS):
+        raise EntradaInvalidaError(f"El largo mínimo para generar contraseñas válidas es {len(GRUPOS)}.")
+
+    filtro = _filtro_contraseñas
+    rechazos_filtro = 0     # rechazos seguidos del filtro: un filtro saturado rechaza todo
+    fuente = rng if rng is not None else FUENTE_RANDOM
+    restantes = cantidad
+    while restantes > 0:
+        n = min(lote, restantes)
+        caracteres = fuente.caracteres(n * largo_contraseña)
+        for i in range(0, len(caracteres), largo_contraseña):
+            contraseña = caracteres[i:i + largo_contraseña]
+            # Se descartan dentro del lote las que no validarían; las que faltan
+            # se sortean en el próximo lote.
+            if any(grupo.isdisjoint(contraseña) for grupo in _GRUPOS_SET):
+                continue
+            if _AUTOMATA_PROHIBIDAS.contiene(contraseña):
+                continue
+            # validar también las rechazaría (incluidos los falsos positivos del filtro)
+            if filtro is not None and contraseña in filtro:
+                rechazos_filtro += 1
+                if rechazos_filtro >= MAX_RECHAZOS_FILTRO:
+                    raise EntradaInvalidaError("El filtro de contraseñas rechaza casi todas las contraseñas "
+                                               "generadas; reconstruilo con más memoria.")
+                continue
+            rechazos_filtro = 0
+            restantes -= 1
+            yield contraseña
+            if restantes == 0:
+                return
+
+
+# ==== Contraseñas filtradas (filtro de Bloom) ====
+
+class FiltroBloom:
+    """
+    Filtro de Bloom en un archivo mapeado en memoria, para listas de contraseñas filtradas.
+
+    Permite preguntar si una contraseña está en una lista de decenas de millones de
+    entradas sin cargarla en un set: cada consulta calcula un hash (blake2b) y lee
+    `k` bits del archivo. Puede dar falsos positivos (con la tasa elegida al
+    construirlo), nunca falsos negativos. La comparación es exacta (distingue
+    mayúsculas), como en las listas de contraseñas filtradas.
+
+    Formato: encabezado `MAGIA` + (bits, hashes, entradas) en '<QIQ' + arreglo de bits.
+    Se abre con `FiltroBloom(ruta)` y se construye con `FiltroBloom.construir`.
+
+    Parámetros:
+        ruta (str): Archivo del filtro.
+
+    Raises:
+        ArchivoNoAccesibleError: Si el archivo no existe o no es un filtro válido.
+    """
+
+    MAGIA = b"PLBLOOM1"
+    _ENCABEZADO = struct.Struct("<QIQ")
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        try:
+            with open(ruta, "rb") as f:
+                self._mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise ArchivoNoAccesibleError(f"No se pudo abrir el filtro '{ruta}': {e}")
+        inicio = len(self.MAGIA) + self._ENCABEZADO.size
+        if self._mapa[:len(self.MAGIA)] != self.MAGIA or len(self._mapa) < inicio:
+            self._mapa.close()
+            raise ArchivoNoAccesibleError(f"'{ruta}' no es un filtro de contraseñas válido.")
+        self.bits, self.hashes, self.entradas = self._ENCABEZADO.unpack_from(self._mapa, len(self.MAGIA))
+        self._inicio = inicio
+        if len(self._mapa) < inicio + (self.bits + 7) // 8:
+            self._mapa.close()
+            raise ArchivoNoAccesibleError(f"El filtro '{ruta}' está truncado.")
+
+    @staticmethod
+    def _posiciones(dato, bits, hashes):
+        import hashlib     # se importa solo si hace falta
+        # Doble hashing (Kirsch-Mitzenmacher): h1 + i*h2 con dos mitades de un blake2b de 128 bits
+        resumen = hashlib.blake2b(dato, digest_size=16).digest()
+        h1 = int.from_bytes(resumen[:8], "little")
+        h2 = int.from_bytes(resumen[8:], "little") | 1
+        return [(h1 + i * h2) % bits for i in range(hashes)]
+
+    def __contains__(self, contraseña):
+        mapa = self._mapa
+        inicio = self._inicio
+        for posicion in self._posiciones(contraseña.encode("utf-8"), self.bits, self.hashes):
+            if not mapa[inicio + (posicion >> 3)] & (1 << (posicion & 7)):
+                return False
+        return True
+
+    def tasa_falsos_positivos(self):
+        """Tasa de falsos positivos esperada para las entradas cargadas."""
+        if not self.entradas:
+            return 0.0
+        return (1 - math.exp(-self.hashes * self.entradas / self.bits)) ** self.hashes
+
+    def cerrar(self):
+        """Libera el mapeo del archivo."""
+        self._mapa.close()
+
+    @staticmethod
+    def dimensionar(entradas, tasa_falsos=0.001, memoria_max=None):
+        """
+        Calcula bits y cantidad de hashes para `entradas` con la tasa de falsos positivos pedida.
+
+        Parámetros:
+            entradas: Cantidad de contraseñas a cargar.
+            tasa_falsos: Tasa de falsos positivos buscada. Por omisión 0.001.
+            memoria_max: Bytes máximos del arreglo de bits; si no alcanza, se usa ese tamaño y la tasa sube.
+
+        Returns:
+            tupla: (bits, hashes)
+        """
+        entradas = max(1, entradas)
+        bits = math.ceil(-entradas * math.log(tasa_falsos) / math.log(2) ** 2)
+        if memoria_max is not None:
+            bits = min(bits, memoria_max * 8)
+        bits = max(8, bits)
+        hashes = max(1, round(bits / entradas * math.log(2)))
+        return bits, hashes
+
+    @classmethod
+    def construir(cls, lineas, ruta, entradas, tasa_falsos=0.001, memoria_max=None):
+        """
+        Construye el filtro recorriendo una lista de contraseñas una sola vez.
+
+        Los bits se escriben directamente sobre el archivo mapeado, así que la memoria
+        no depende del tamaño de la lista.
+
+        Parámetros:
+            lineas: Iterable de líneas en bytes (p.ej. un archivo abierto en 'rb').
+            ruta: Archivo del filtro a crear.
+            entradas: Cantidad (estimada) de contraseñas, para dimensionar el filtro.
+            tasa_falsos: Tasa de falsos positivos buscada. Por omisión 0.001.
+            memoria_max: Bytes máximos del arreglo de bits (ver `dimensionar`).
+
+        Returns:
+            FiltroBloom: El filtro construido, abierto para consultas.
+
+        Raises:
+            ArchivoNoAccesibleError: Si no se puede escribir el archivo.
+        """
+        bits, hashes = cls.dimensionar(entradas, tasa_falsos, memoria_max)
+        inicio = len(cls.MAGIA) + cls._ENCABEZADO.size
+        temporal = f"{ruta}.tmp"
+        cargadas = 0
+        try:
+            with open(temporal, "w+b") as f:
+                f.truncate(inicio + (bits + 7) // 8)
+                with mmap.mmap(f.fileno(), 0) as mapa:
+                    posiciones = cls._posiciones
+                    for linea in lineas:
+                        linea = linea.rstrip(b"\r\n")
+                        if not linea:
+                            continue
+                        for posicion in posiciones(linea, bits, hashes):
+                            indice = inicio + (posicion >> 3)
+                            mapa[indice] = mapa[indice] | (1 << (posicion & 7))
+                        cargadas += 1
+                    mapa[:inicio] = cls.MAGIA + cls._ENCABEZADO.pack(bits, hashes, cargadas)
+            os.replace(temporal, ruta)
+        except OSError as e:
+            raise ArchivoNoAccesibleError(f"No se pudo escribir el filtro '{ruta}': {e}")
+        return cls(ruta)
+
+
+def cargar_filtro_contraseñas(ruta):
+    """
+    Hace que `validar`/`evaluar_contraseña` rechacen las contraseñas del filtro indicado.
+
+    Parámetros:
+        ruta: Archivo construido con `FiltroBloom.construir` (o `construir-filtro`). None lo desactiva.
+
+    Returns:
+        FiltroBloom | None: El filtro cargado.
+
+    Raises:
+        ArchivoNoAccesibleError: Si el archivo no existe o no es un filtro válido.
+    """
+    global _filtro_contraseñas
+    _filtro_contraseñas = FiltroBloom(ruta) if ruta is not None else None
+    return _filtro_contraseñas
+
+
+# Resultado de evaluar_contraseña: faltantes es una tupla con los mensajes de los
+# requisitos que no se cumplen (vacía si la contraseña es válida).
+ResultadoValidacion = namedtuple("ResultadoValidacion", ("valida", "faltantes", "puntaje", "nivel"))
+
+
+def evaluar_contraseña(contraseña, largo_min=12):
+    """
+    Evalúa una contraseña con las mismas reglas y puntaje que `validar`, sin imprimir ni lanzar excepciones.
+
+    Clasifica todos los caracteres en una sola pasada (un `Counter` y una búsqueda por
+    caracter distinto) en lugar de recorrer la contraseña una vez por requisito.
+
+    Parámetros:
+        contraseña: Contraseña a evaluar.
+        largo_min: Longitud mínima requerida (por omisión 12).
+
+    Returns:
+        ResultadoValidacion: (valida, faltantes, puntaje, nivel), con nivel 'DÉBIL',
+        'INTERMEDIA' o 'FUERTE'. El puntaje se calcula aunque la contraseña no sea válida.
+    """
+    # Cantidad de caracteres por grupo: mayúsculas, minúsculas, números, especiales
+    cantidades = [0, 0, 0, 0]
+    for caracter, veces in Counter(contraseña).items():
+        grupo = _GRUPO_DE.get(caracter)
+        if grupo is not None:
+            cantidades[grupo] += veces
+    cantidad_mayusculas, cantidad_minusculas, cantidad_numeros, cantidad_especiales = cantidades
+    largo = len(contraseña)
+
     # ---- 1. Validaciones básicas ----
     requisitos_faltantes = []
 
-    if len(contraseña) < largo_min:
+    if largo < largo_min:
         requisitos_faltantes.append(f"- Tener al menos {largo_min} caracteres.")
 
-    if not any(c in numeros for c in contraseña):
+    if not cantidad_numeros:
         requisitos_faltantes.append("- Contener al menos un número (0-9).")
 
-    if not any(c in caracteres_especiales for c in contraseña):
+    if not cantidad_especiales:
         requisitos_faltantes.append("- Incluir al menos un caracter especial (%, &, !, etc.).")
 
-    if not any(c in letras_mayusculas for c in contraseña):
+    if not cantidad_mayusculas:
         requisitos_faltantes.append("- Tener al menos una letra mayúscula (A-Z).")
 
-    if not any(c in letras_minusculas for c in contraseña):
+    if not cantidad_minusculas:
         requisitos_faltantes.append("- Tener al menos una letra minúscula (a-z).")
 
-    palabras_prohibidas = ("password", "admin", "contraseña", "clave", "claves")
-    if any(p.lower() in contraseña.lower() for p in palabras_prohibidas):
+    if _AUTOMATA_PROHIBIDAS.contiene(contraseña):
         requisitos_faltantes.append("- No contener palabras prohibidas como 'password', 'admin', 'clave', etc.")
 
-    if requisitos_faltantes:
-        mensaje = "❌ La contraseña no cumple con los siguientes requisitos:\n" + "\n".join(requisitos_faltantes)
-        raise ContraseñaInvalidaError(mensaje)
-
-    # ---- 2. Si pasa todo, calculamos robustez ----
-    largo = len(contraseña)
-    cantidad_mayusculas = sum(1 for c in contraseña if c in letras_mayusculas)
-    cantidad_minusculas = sum(1 for c in contraseña if c in letras_minusculas)
-    cantidad_numeros = sum(1 for c in contraseña if c in numeros)
-    cantidad_especiales = sum(1 for c in contraseña if c in caracteres_especiales)
+    filtro = _filtro_contraseñas
+    if filtro is not None and contraseña in filtro:
+        requisitos_faltantes.append("- No ser una contraseña filtrada o demasiado común.")
 
+    # ---- 2. Robustez ----
     # Puntaje base según largo
     puntaje = largo // 2
     if largo <= 15:
@@ -296,16 +2247,57 @@ def validar(contraseña, largo_min=12):
     if cantidad_especiales > 3:
         puntaje += 2
 
-    # Penalizaciones
-    secuencias_no_recomendadas = ("123", "456", "789", "abc", "ABC")
-    for palabra in secuencias_no_recomendadas:
-        if palabra in contraseña:
-            puntaje -= 7
+    # Penalizaciones: cada secuencia distinta que aparece resta PENALIZACION_SECUENCIA
+    puntaje -= PENALIZACION_SECUENCIA * len(_AUTOMATA_SECUENCIAS.encontrados(contraseña))
 
     # Determinamos el nivel
     if puntaje <= 12:
-        nivel = COLORES["alerta"] + "⚠ DÉBIL" + COLORES["reset"]
+        nivel = "DÉBIL"
     elif puntaje <= 25:
+        nivel = "INTERMEDIA"
+    else:
+        nivel = "FUERTE"
+
+    return ResultadoValidacion(not requisitos_faltantes, tuple(requisitos_faltantes), puntaje, nivel)
+
+
+def evaluar_muchas(contraseñas, largo_min=12):
+    """
+    Evalúa una lista de contraseñas (ver `evaluar_contraseña`).
+
+    Parámetros:
+        contraseñas: Iterable de contraseñas.
+        largo_min: Longitud mínima requerida (por omisión 12).
+
+    Returns:
+        list: Un ResultadoValidacion por contraseña, en el mismo orden.
+    """
+    return [evaluar_contraseña(contraseña, largo_min) for contraseña in contraseñas]
+
+
+def validar(contraseña, largo_min=12):
+    """
+    Verifica que la contraseña cumpla con los requisitos mínimos de seguridad.
+
+    Parámetros:
+        contraseña: Contraseña a validar.
+        largo_min: Longitud mínima requerida (por omisión 12).
+
+    Returns:
+        bool: True si cumple con todos los criterios.
+
+    Raises:
+        ContraseñaInvalidaError: Si falta algún requisito.
+    """
+    resultado = evaluar_contraseña(contraseña, largo_min)
+
+    if not resultado.valida:
+        mensaje = "❌ La contraseña no cumple con los siguientes requisitos:\n" + "\n".join(resultado.faltantes)
+        raise ContraseñaInvalidaError(mensaje)
+
+    if resultado.nivel == "DÉBIL":
+        nivel = COLORES["alerta"] + "⚠ DÉBIL" + COLORES["reset"]
+    elif resultado.nivel == "INTERMEDIA":
         nivel = COLORES["info"] + "INTERMEDIA" + COLORES["reset"]
     else:
         nivel = COLORES["ok"] + "FUERTE" + COLORES["reset"]
@@ -315,13 +2307,22 @@ def validar(contraseña, largo_min=12):
     return True
 
 
-def ingresar_contraseña():
+def ingresar_contraseña(usuario=None, almacen=None):
     """
     Permite al usuario ingresar manualmente una contraseña o generar una aleatoria.
 
+    Parámetros:
+        usuario (opcional): Si se indica, se rechazan las contraseñas de su historial y la nueva se agrega.
+        almacen (opcional): Almacén del historial. Por omisión `ALMACEN_CREDENCIALES`.
+
     Returns:
         tupla: (contraseña_encriptada, lista_encriptacion)
+
+    Raises:
+        ContraseñaInvalidaError: Si la contraseña no cumple los requisitos.
+        ContraseñaReutilizadaError: Si ya se usó antes (subclase de ContraseñaInvalidaError).
     """
+    historial = HistorialContraseñas(usuario, almacen) if usuario is not None else None
     while True:
         while True:
             try:
@@ -340,83 +2341,41 @@ def ingresar_contraseña():
             contraseña = input("Ingrese la contraseña que quiere para esta app: ")
             
             if validar(contraseña):       # <--- Levanta ContraseñaInvalidaError
-                contraseña_encriptada, lista_encriptacion = encriptar(contraseña)
+                if historial is not None and historial.contiene(contraseña):
+                    raise ContraseñaReutilizadaError("❌ Ya usaste esa contraseña antes. Elegí una que no esté en tu historial.")
+                contraseña_encriptada, lista_encriptacion = encriptar(contraseña, rng=POZO_ENTROPIA)
+                # Al historial solo después de encriptar: si encriptar falla, la contraseña no se usó
+                if historial is not None:
+                    historial.agregar(contraseña)
                 return contraseña_encriptada, lista_encriptacion
             break
 
         else:   # eleccion == 2
-            while True:
-                contraseña = crear_contraseña()
-                try:
-                    if validar(contraseña):
-                        break
-                except ContraseñaInvalidaError:
-                    continue
+            # crear_contraseñas garantiza los requisitos, no hace falta reintentar
+            contraseña = crear_contraseñas(1, rng=POZO_ENTROPIA)[0]
+            validar(contraseña)
 
-            contraseña_encriptada, lista_encriptacion = encriptar(contraseña)
+            contraseña_encriptada, lista_encriptacion = encriptar(contraseña, rng=POZO_ENTROPIA)
+            if historial is not None:
+                historial.agregar(contraseña)
             return contraseña_encriptada, lista_encriptacion
 
 
     
-def encriptar(clave_original):
+def encriptar(clave_original, compacta=False, rng=None):
     """
     Encripta una clave generando una contraseña aleatoria del mismo largo y una lista de desplazamientos.
 
     Args:
         clave_original: Contraseña original en texto plano.
+        compacta: Si es True, la lista sale en formato compacto 'b64:...' en lugar de 'd|d|...'.
+        rng: Fuente de aleatoriedad de la clave encriptada (ver `crear_contraseña`). Por omisión el módulo `random`.
 
     Returns:
         tupla: (clave_encriptada, cadena_encriptacion)
     """
-    largo_clave_original= len(clave_original)
-    clave_encriptada = crear_contraseña(largo_clave_original)
-    
-    lista_encriptacion = []
-    
-    for i in range(0,largo_clave_original):
-        
-        # Grupo y posición del carácter original
-        caracter = clave_original[i]
-        for j in range(0,4):
-            if caracter in letras_mayusculas:
-                tupla_original = 0
-                posicion_original = letras_mayusculas.index(caracter)
-            elif caracter in letras_minusculas:
-                tupla_original = 1
-                posicion_original = letras_minusculas.index(caracter)
-            elif caracter in numeros:
-                tupla_original = 2
-                posicion_original = numeros.index(caracter)
-            else: 
-                tupla_original = 3
-                posicion_original = caracteres_especiales.index(caracter)
-                
-         # Grupo y posición del carácter "encriptado"               
-        caracter = clave_encriptada[i]
-        for j in range(0,4):
-            if caracter in letras_mayusculas:
-                tupla_encriptada = 0
-                posicion_encriptada = letras_mayusculas.index(caracter)
-            elif caracter in letras_minusculas:
-                tupla_encriptada = 1
-                posicion_encriptada = letras_minusculas.index(caracter)
-            elif caracter in numeros:
-                tupla_encriptada = 2
-                posicion_encriptada = numeros.index(caracter)
-            else: 
-                tupla_encriptada = 3
-                posicion_encriptada = caracteres_especiales.index(caracter)
-                
-        
-         # Guardamos las diferencias intercalando el separador '|'
-        lista_encriptacion.append(tupla_encriptada-tupla_original)
-        lista_encriptacion.append("|")
-        lista_encriptacion.append(posicion_encriptada - posicion_original)
-        lista_encriptacion.append("|")
-        cadena_encriptada = "".join(map(str, lista_encriptacion))
-
-    
-    return clave_encriptada,cadena_encriptada
+    clave_encriptada = crear_contraseña(len(clave_original), rng)
+    return CODIFICADOR.codificar(clave_original, clave_encriptada, compacta)
     
   
 def desencriptar(clave_encriptada, lista_encriptacion):
@@ -425,52 +2384,180 @@ def desencriptar(clave_encriptada, lista_encriptacion):
 
     Parámetros:
         clave_encriptada: Contraseña encriptada.
-        lista_encriptacion: Lista de encriptación (algortimo utilizado) generada al encriptar.
+        lista_encriptacion: Lista de encriptación (algortimo utilizado) generada al encriptar:
+            lista de enteros, cadena 'd|d|...', cadena compacta 'b64:...' o bytes/memoryview.
 
     Returns:
         str: Contraseña original.
     """
-    
-    largo_clave_encriptada= len(clave_encriptada)
-    clave_original = []
-    
-    for i in range(0,largo_clave_encriptada):
-        caracter = clave_encriptada[i]
-        for j in range(0,4):
-            if caracter in letras_mayusculas:
-                tupla_encriptada = 0
-                posicion_encriptada = letras_mayusculas.index(caracter)
-            elif caracter in letras_minusculas:
-                tupla_encriptada = 1
-                posicion_encriptada = letras_minusculas.index(caracter)
-            elif caracter in numeros:
-                tupla_encriptada = 2
-                posicion_encriptada = numeros.index(caracter)
-            else: 
-                tupla_encriptada = 3
-                posicion_encriptada = caracteres_especiales.index(caracter)
-                
-        
-        tupla_original =  tupla_encriptada - lista_encriptacion[i*2]
-        posicion_original = posicion_encriptada - lista_encriptacion[i*2+1]
-            
-        if tupla_original == 0:
-            caracter = letras_mayusculas[posicion_original]
-        elif  tupla_original == 1:
-            caracter = letras_minusculas[posicion_original]
-        elif  tupla_original == 2:
-            caracter = numeros[posicion_original]
-        else: 
-            caracter = caracteres_especiales[posicion_original]
-                
-        
-        clave_original.append(caracter)
-    clave_original = "".join(clave_original)
-    return clave_original
+    return CODIFICADOR.decodificar(clave_encriptada, lista_encriptacion)
 
 # Convierte '1|2|3|' → [1,2,3]
 enlistar = lambda cadena: [int(x) for x in cadena.split("|") if x!=""]
 
+# Formato compacto de la lista: los desplazamientos como bytes con signo (array('b'))
+# en base64, con este prefijo para distinguirlo del formato 'd|d|...'
+PREFIJO_COMPACTO = "b64:"
+LISTA_COMPACTA = False      # si es True, login() guarda las cuentas nuevas en formato compacto
+
+
+class CodificadorClaves:
+    """
+    Codificador reutilizable del formato `enc;lista` de `encriptar`/`desencriptar`.
+
+    Las tablas de búsqueda (grupo y posición de cada caracter, y el desplazamiento
+    ya formateado para cada par original/encriptado) se arman una sola vez: el índice
+    al crear el objeto y las tablas de pares en el primer encriptado.
+
+    La salida es idéntica, byte a byte, a la de `encriptar`. Con `compacta=True` la
+    lista sale como bytes con signo en base64 ('b64:...'), que `decodificar` reconoce
+    sola.
+
+    Parámetros:
+        grupos: Tuplas de caracteres en el orden del mapeo. Por omisión `GRUPOS`.
+    """
+
+    def __init__(self, grupos=GRUPOS):
+        self.grupos = tuple(grupos)
+        self._indice = {}
+        for tupla, grupo in enumerate(self.grupos):
+            for posicion, caracter in enumerate(grupo):
+                self._indice.setdefault(caracter, (tupla, posicion))
+
+        # Las tablas de pares se arman en el primer encriptado (ver _tabla)
+        self._desplazamientos = None
+        self._desplazamientos_compactos = None
+
+        # Fuente de codificar_muchos sin rng: la compartida si los grupos son los de siempre
+        self._fuente = FUENTE_RANDOM if self.grupos == FUENTE_RANDOM.grupos else FuenteRandom(self.grupos)
+
+    def _tabla(self, compacta):
+        """Tabla '<original><encriptado>' -> desplazamiento ('dt|dp|' o 2 bytes con signo)."""
+        if compacta:
+            if self._desplazamientos_compactos is None:
+                self._desplazamientos_compactos = {
+                    original + encriptado: array("b", (t_enc - t_orig, p_enc - p_orig)).tobytes()
+                    for original, (t_orig, p_orig) in self._indice.items()
+                    for encriptado, (t_enc, p_enc) in self._indice.items()
+                }
+            return self._desplazamientos_compactos
+        if self._desplazamientos is None:
+            self._desplazamientos = {
+                original + encriptado: f"{t_enc - t_orig}|{p_enc - p_orig}|"
+                for original, (t_orig, p_orig) in self._indice.items()
+                for encriptado, (t_enc, p_enc) in self._indice.items()
+            }
+        return self._desplazamientos
+
+    def codificar(self, clave_original, clave_encriptada, compacta=False):
+        """
+        Calcula la cadena de desplazamientos entre una clave y su clave encriptada.
+
+        Parámetros:
+            clave_original: Contraseña en texto plano.
+            clave_encriptada: Contraseña aleatoria del mismo largo.
+            compacta: Si es True, devuelve la cadena en formato 'b64:...'.
+
+        Returns:
+            tupla: (clave_encriptada, cadena_encriptacion)
+
+        Raises:
+            ValueError: Si algún caracter no pertenece a ningún grupo.
+        """
+        tabla = self._tabla(compacta)
+        try:
+            if compacta:
+                cadena = PREFIJO_COMPACTO + base64.b64encode(
+                    b"".join([tabla[o + e] for o, e in zip(clave_original, clave_encriptada)])).decode("ascii")
+            else:
+                cadena = "".join([tabla[o + e] for o, e in zip(clave_original, clave_encriptada)])
+        except KeyError:
+            caracter = next(c for c in clave_original + clave_encriptada if c not in self._indice)
+            raise ValueError(f"Caracter no soportado: {caracter!r}") from None
+        return clave_encriptada, cadena
+
+    def decodificar(self, clave_encriptada, lista_encriptacion):
+        """
+        Recupera la clave original a partir de la clave encriptada y sus desplazamientos.
+
+        Parámetros:
+            clave_encriptada: Contraseña encriptada.
+            lista_encriptacion: Desplazamientos como lista de enteros, cadena 'd|d|...',
+                cadena compacta 'b64:...' o bytes/memoryview de bytes con signo.
+
+        Returns:
+            str: Contraseña original.
+
+        Raises:
+            ValueError: Si algún caracter no pertenece a ningún grupo o el base64 es inválido.
+        """
+        if isinstance(lista_encriptacion, str):
+            if lista_encriptacion.startswith(PREFIJO_COMPACTO):
+                lista_encriptacion = memoryview(
+                    base64.b64decode(lista_encriptacion[len(PREFIJO_COMPACTO):], validate=True)).cast("b")
+            else:
+                lista_encriptacion = enlistar(lista_encriptacion)
+        elif isinstance(lista_encriptacion, (bytes, bytearray, memoryview)):
+            # Se lee directo sobre el buffer, sin armar una lista intermedia
+            lista_encriptacion = memoryview(lista_encriptacion).cast("B").cast("b")
+
+        indice = self._indice
+        grupos = self.grupos
+        ultimo = len(grupos) - 1
+        clave_original = []
+        try:
+            for caracter, d_tupla, d_posicion in zip(clave_encriptada, lista_encriptacion[0::2], lista_encriptacion[1::2]):
+                tupla, posicion = indice[caracter]
+                tupla -= d_tupla
+                # Igual que desencriptar: cualquier grupo fuera de rango cae en el último
+                grupo = grupos[tupla] if 0 <= tupla < ultimo else grupos[ultimo]
+                clave_original.append(grupo[posicion - d_posicion])
+        except KeyError as e:
+            raise ValueError(f"Caracter no soportado: {e.args[0]!r}") from None
+        if len(clave_original) < len(clave_encriptada):
+            raise IndexError("La lista de encriptación es más corta que la clave.")
+        return "".join(clave_original)
+
+    def codificar_muchos(self, claves, compacta=False, rng=None):
+        """
+        Encripta muchas claves de una vez, sorteando todas las claves aleatorias juntas.
+
+        Parámetros:
+            claves: Iterable de contraseñas en texto plano.
+            compacta: Si es True, las cadenas salen en formato 'b64:...'.
+            rng: Fuente de aleatoriedad armada con los mismos grupos. Por omisión el módulo `random`.
+
+        Returns:
+            list: Tuplas (clave_encriptada, cadena_encriptacion), en el mismo orden.
+        """
+        claves = list(claves)
+        total = sum(len(clave) for clave in claves)
+        caracteres = (rng if rng is not None else self._fuente).caracteres(total)
+        resultado = []
+        inicio = 0
+        for clave in claves:
+            fin = inicio + len(clave)
+            resultado.append(self.codificar(clave, caracteres[inicio:fin], compacta))
+            inicio = fin
+        return resultado
+
+    def decodificar_muchos(self, pares):
+        """
+        Desencripta muchas claves de una vez.
+
+        Parámetros:
+            pares: Iterable de tuplas (clave_encriptada, lista_encriptacion), con la
+                lista en cualquiera de los formatos que acepta `decodificar`.
+
+        Returns:
+            list: Contraseñas originales, en el mismo orden.
+        """
+        decodificar = self.decodificar
+        return [decodificar(enc, lista) for enc, lista in pares]
+
+
+CODIFICADOR = CodificadorClaves()
+
 def main():
     """
     Punto de entrada principal del programa.
@@ -487,6 +2574,7 @@ def main():
         - En caso de error, se registran los detalles mediante `log_event()` y se informa al usuario por consola.
 
     Excepciones controladas:
+        - ContraseñaReutilizadaError: Si la contraseña ya está en el historial del usuario.
         - ContraseñaInvalidaError: Si la contraseña ingresada no cumple los requisitos mínimos.
         - CuentaNoEncontradaError: Si la cuenta solicitada no existe.
         - EntradaInvalidaError: Si el usuario ingresa un dato con formato incorrecto.
@@ -504,7 +2592,7 @@ def main():
         try:
             user, contraseña = login()
 
-            contraseña, lista = ingresar_contraseña()
+            contraseña, lista = ingresar_contraseña(user)
             if contraseña:
                 print(contraseña)
 
@@ -519,6 +2607,9 @@ def main():
 
             break
 
+        except ContraseñaReutilizadaError as e:
+            log_event("password_reused", "WARN", str(e), usuario=user, funcion="menu")
+            print(COLORES["alerta"], str(e), COLORES["reset"])
         except ContraseñaInvalidaError as e:
             log_event("weak_password", "WARN", str(e), usuario=user, funcion="menu")
             print(COLORES["alerta"], str(e), COLORES["reset"])
@@ -543,5 +2634,800 @@ def main():
 
 
 
+# ==== Perfilado opcional ====
+
+# Funciones del módulo que activar_perfilado() envuelve con contadores y cronómetros
+FUNCIONES_PERFILADAS = ("login", "validar", "evaluar_contraseña", "crear_contraseña",
+                        "encriptar", "desencriptar", "log_event")
+
+
+class Perfilador:
+    """
+    Contadores de llamadas, latencias y bytes leídos/escritos por función.
+
+    Las latencias se guardan en una muestra acotada (las últimas `muestras` llamadas
+    de cada función) para calcular percentiles. Es seguro usarlo desde varios hilos.
+    Los bytes de E/S se atribuyen a la función perfilada que se está ejecutando en
+    ese hilo (p.ej. la lectura del almacén dentro de `login`), o al nombre indicado
+    si no hay ninguna.
+
+    Parámetros:
+        muestras (int, opcional): Latencias guardadas por función. Por defecto 10000.
+    """
+
+    def __init__(self, muestras=10000):
+        self.muestras = muestras
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._datos = {}
+        self._originales = {}
+        self._detener = None
+        self._hilo = None
+
+    def _entrada(self, nombre):
+        datos = self._datos.get(nombre)
+        if datos is None:
+            datos = self._datos[nombre] = {"llamadas": 0, "errores": 0, "total_s": 0.0, "bytes_leidos": 0,
+                                           "bytes_escritos": 0, "latencias": deque(maxlen=self.muestras)}
+        return datos
+
+    def _pila(self):
+        pila = getattr(self._local, "pila", None)
+        if pila is None:
+            pila = self._local.pila = []
+        return pila
+
+    def envolver(self, nombre, funcion):
+        """Devuelve `funcion` envuelta para registrar cada llamada bajo `nombre`."""
+        @functools.wraps(funcion)
+        def perfilada(*args, **kwargs):
+            pila = self._pila()
+            pila.append(nombre)
+            error = False
+            inicio = time.perf_counter()
+            try:
+                return funcion(*args, **kwargs)
+            except BaseException:
+                error = True
+                raise
+            finally:
+                duracion = time.perf_counter() - inicio
+                pila.pop()
+                self.registrar(nombre, duracion, error)
+        return perfilada
+
+    def registrar(self, nombre, duracion, error=False):
+        """Suma una llamada de `duracion` segundos a `nombre`."""
+        with self._lock:
+            datos = self._entrada(nombre)
+            datos["llamadas"] += 1
+            datos["errores"] += error
+            datos["total_s"] += duracion
+            datos["latencias"].append(duracion)
+
+    def sumar_bytes(self, funcion, leidos=0, escritos=0):
+        """Suma bytes de E/S a la función perfilada en curso (o a `funcion` si no hay)."""
+        pila = self._pila()
+        nombre = pila[-1] if pila else funcion
+        with self._lock:
+            datos = self._entrada(nombre)
+            datos["bytes_leidos"] += leidos
+            datos["bytes_escritos"] += escritos
+
+    def instantanea(self):
+        """
+        Devuelve una copia de las métricas actuales.
+
+        Returns:
+            dict: Por función: llamadas, errores, total_s, medio_s, p50_s, p90_s, p99_s,
+            max_s, bytes_leidos y bytes_escritos.
+        """
+        with self._lock:
+            copia = {nombre: dict(datos, latencias=sorted(datos["latencias"])) for nombre, datos in self._datos.items()}
+        resultado = {}
+        for nombre, datos in copia.items():
+            latencias = datos.pop("latencias")
+            datos["medio_s"] = datos["total_s"] / datos["llamadas"] if datos["llamadas"] else 0.0
+            for etiqueta, q in (("p50_s", 0.50), ("p90_s", 0.90), ("p99_s", 0.99)):
+                datos[etiqueta] = latencias[min(len(latencias) - 1, int(q * len(latencias)))] if latencias else 0.0
+            datos["max_s"] = latencias[-1] if latencias else 0.0
+            resultado[nombre] = datos
+        return resultado
+
+    def reiniciar(self):
+        """Pone todos los contadores en cero."""
+        with self._lock:
+            self._datos = {}
+
+    def volcar(self, archivo):
+        """Escribe la instantánea en `archivo` como JSON (temporal + rename). No lanza errores de E/S."""
+        temporal = f"{archivo}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump({"fecha": datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "funciones": self.instantanea()},
+                          f, ensure_ascii=False, indent=2)
+            os.replace(temporal, archivo)
+        except OSError:
+            pass
+
+    def iniciar_volcado(self, archivo, intervalo=60.0):
+        """Vuelca la instantánea a `archivo` cada `intervalo` segundos desde un hilo aparte."""
+        self.detener_volcado()
+        self._detener = threading.Event()
+
+        def volcar_periodicamente(detener):
+            while not detener.wait(intervalo):
+                self.volcar(archivo)
+            self.volcar(archivo)
+
+        self._hilo = threading.Thread(target=volcar_periodicamente, args=(self._detener,),
+                                      name="perfilado", daemon=True)
+        self._hilo.start()
+
+    def detener_volcado(self):
+        """Detiene el volcado periódico, haciendo un último volcado."""
+        if self._hilo is not None:
+            self._detener.set()
+            self._hilo.join()
+            self._hilo = None
+
+
+def activar_perfilado(archivo=None, intervalo=60.0, muestras=10000):
+    """
+    Activa el perfilado de las funciones de `FUNCIONES_PERFILADAS`.
+
+    Reemplaza esas funciones del módulo por versiones envueltas; con el perfilado
+    desactivado se usan las originales, así que no hay costo alguno. Las llamadas
+    internas del módulo (p.ej. `login` -> `desencriptar`) quedan medidas; los
+    `from pass_logic import ...` hechos antes de activarlo no.
+
+    Parámetros:
+        archivo (str, opcional): Si se indica, se vuelca la instantánea en JSON periódicamente y al salir.
+        intervalo (float, opcional): Segundos entre volcados. Por defecto 60.
+        muestras (int, opcional): Latencias guardadas por función para los percentiles. Por defecto 10000.
+
+    Returns:
+        Perfilador: El perfilador activo.
+    """
+    global _perfilador
+    desactivar_perfilado()
+    perfilador = Perfilador(muestras)
+    modulo = globals()
+    for nombre in FUNCIONES_PERFILADAS:
+        perfilador._originales[nombre] = modulo[nombre]
+        modulo[nombre] = perfilador.envolver(nombre, modulo[nombre])
+    if archivo:
+        perfilador.iniciar_volcado(archivo, intervalo)
+        atexit.register(perfilador.detener_volcado)
+    _perfilador = perfilador
+    return perfilador
+
+
+def desactivar_perfilado():
+    """
+    Restaura las funciones originales y detiene el volcado periódico.
+
+    Returns:
+        Perfilador | None: El perfilador que estaba activo (sus métricas siguen disponibles).
+    """
+    global _perfilador
+    perfilador, _perfilador = _perfilador, None
+    if perfilador is None:
+        return None
+    globals().update(perfilador._originales)
+    perfilador.detener_volcado()
+    atexit.unregister(perfilador.detener_volcado)
+    return perfilador
+
+
+def instantanea_perfilado():
+    """Métricas del perfilador activo (ver `Perfilador.instantanea`), o {} si está desactivado."""
+    return _perfilador.instantanea() if _perfilador is not None else {}
+
+
+# ==== Procesamiento masivo (sin input()) ====
+
+def _procesar_lote(lineas, modo, compacta=False):
+    """
+    Codifica o decodifica un lote de líneas. Se ejecuta dentro de los procesos del pool.
+
+    Parámetros:
+        lineas: Lista de líneas sin el salto de línea final.
+        modo: 'codificar' (texto plano -> 'enc;lista') o 'decodificar' ('enc;lista' -> texto plano).
+        compacta: Si es True, al codificar la lista sale en formato 'b64:...'.
+
+    Returns:
+        tupla: (lineas_de_salida, cantidad_de_errores). Las líneas inválidas salen vacías
+        para no desalinear la salida con la entrada.
+    """
+    if modo == "codificar":
+        try:
+            return [f"{enc};{lista}" for enc, lista in CODIFICADOR.codificar_muchos(lineas, compacta)], 0
+        except ValueError:
+            pass    # hay alguna línea inválida: se procesa de a una
+
+    salida = []
+    errores = 0
+    for linea in lineas:
+        try:
+            if modo == "codificar":
+                enc, lista = CODIFICADOR.codificar(linea, crear_contraseña(len(linea)), compacta)
+                salida.append(f"{enc};{lista}")
+            else:
+                enc, lista = linea.split(";", 1)
+                salida.append(CODIFICADOR.decodificar(enc, lista))
+        except (ValueError, IndexError):
+            salida.append("")
+            errores += 1
+    return salida, errores
+
+
+def _leer_lotes(entrada, lote):
+    """Agrupa las líneas de `entrada` en listas de a `lote`, sin cargar todo el archivo."""
+    lineas = []
+    for linea in entrada:
+        lineas.append(linea.rstrip("\r\n"))
+        if len(lineas) >= lote:
+            yield lineas
+            lineas = []
+    if lineas:
+        yield lineas
+
+
+def _repartir_lotes(funcion, lotes, procesos, argumentos=(), inicializar=random.seed, inicio_args=()):
+    """
+    Aplica `funcion(lote, *argumentos)` a cada lote en un pool de procesos y devuelve los resultados en orden.
+
+    Nunca hay más de dos lotes por proceso en vuelo, así que la memoria no depende de
+    cuántos lotes haya. Con un solo proceso no se crea el pool.
+
+    Parámetros:
+        funcion: Función de nivel de módulo (tiene que poder enviarse a otro proceso).
+        lotes: Iterable de lotes.
+        procesos: Cantidad de procesos.
+        argumentos: Argumentos extra para `funcion`.
+        inicializar / inicio_args: Inicializador de cada proceso del pool.
+
+    Yields:
+        El resultado de cada lote, en el orden de `lotes`.
+    """
+    if procesos == 1:
+        for lote in lotes:
+            yield funcion(lote, *argumentos)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor     # se importa solo si hace falta
+
+    # random.seed() en cada proceso: sin esto los hijos heredan el mismo estado
+    with ProcessPoolExecutor(max_workers=procesos, initializer=inicializar, initargs=inicio_args) as pool:
+        pendientes = deque()
+        for lote in lotes:
+            pendientes.append(pool.submit(funcion, lote, *argumentos))
+            if len(pendientes) >= 2 * procesos:
+                yield pendientes.popleft().result()
+        while pendientes:
+            yield pendientes.popleft().result()
+
+
+def procesar_flujo(entrada, salida, modo, procesos=None, lote=5000, compacta=False):
+    """
+    Codifica o decodifica un flujo de líneas repartiendo lotes entre varios procesos.
+
+    La salida respeta el orden de la entrada y la memoria queda acotada: nunca hay más
+    de dos lotes por proceso en vuelo, sin importar el tamaño de la entrada.
+
+    Parámetros:
+        entrada: Iterable de líneas (archivo abierto o sys.stdin).
+        salida: Archivo de texto donde se escriben los resultados.
+        modo: 'codificar' o 'decodificar'.
+        procesos: Cantidad de procesos. Por omisión os.cpu_count(); con 1 no se usa pool.
+        lote: Líneas por lote. Por omisión 5000.
+        compacta: Si es True, al codificar la lista sale en formato 'b64:...'.
+
+    Returns:
+        tupla: (filas_procesadas, errores, segundos)
+    """
+    if modo not in ("codificar", "decodificar"):
+        raise EntradaInvalidaError(f"Modo desconocido: {modo}")
+    procesos = procesos or os.cpu_count() or 1
+
+    filas = 0
+    errores = 0
+    inicio = time.perf_counter()
+
+    lotes = _leer_lotes(entrada, lote)
+    for lineas, errores_lote in _repartir_lotes(_procesar_lote, lotes, procesos, (modo, compacta)):
+        salida.write("\n".join(lineas) + "\n")
+        filas += len(lineas)
+        errores += errores_lote
+
+    return filas, errores, time.perf_counter() - inicio
+
+
+# Los largos desde este valor se agrupan en una sola barra del histograma
+LARGO_MAXIMO_HISTOGRAMA = 64
+
+
+def _iniciar_proceso_analisis(ruta_filtro, prohibidas, secuencias):
+    """Inicializador del pool de `analizar_corpus`: replica en cada proceso la política del proceso principal."""
+    global palabras_prohibidas, secuencias_no_recomendadas, _AUTOMATA_PROHIBIDAS, _AUTOMATA_SECUENCIAS
+    random.seed()
+    if ruta_filtro is not None:
+        cargar_filtro_contraseñas(ruta_filtro)
+    if prohibidas != palabras_prohibidas:
+        palabras_prohibidas = prohibidas
+        _AUTOMATA_PROHIBIDAS = AutomataPatrones(prohibidas, ignorar_mayusculas=True)
+    if secuencias != secuencias_no_recomendadas:
+        secuencias_no_recomendadas = secuencias
+        _AUTOMATA_SECUENCIAS = AutomataPatrones(secuencias)
+
+
+def _analizar_lote(lineas, largo_min, detalle):
+    """
+    Evalúa un lote de contraseñas y acumula sus histogramas. Se ejecuta dentro de los procesos del pool.
+
+    Returns:
+        tupla: (validas, niveles, faltantes, largos, suma_de_puntajes, lineas_de_detalle o None).
+    """
+    validas = 0
+    niveles = Counter()
+    faltantes = Counter()
+    largos = Counter()
+    puntajes = 0
+    salida = [] if detalle else None
+    for contraseña in lineas:
+        resultado = evaluar_contraseña(contraseña, largo_min)
+        validas += resultado.valida
+        niveles[resultado.nivel] += 1
+        faltantes.update(resultado.faltantes)
+        largos[min(len(contraseña), LARGO_MAXIMO_HISTOGRAMA)] += 1
+        puntajes += resultado.puntaje
+        if detalle:
+            salida.append(json.dumps({"valida": resultado.valida, "puntaje": resultado.puntaje,
+                                      "nivel": resultado.nivel, "faltantes": resultado.faltantes},
+                                     ensure_ascii=False))
+    return validas, niveles, faltantes, largos, puntajes, salida
+
+
+def analizar_corpus(entrada, procesos=None, lote=5000, largo_min=12, detalle=None):
+    """
+    Evalúa un corpus de contraseñas (una por línea) con las reglas de `validar` y resume los resultados.
+
+    Reparte lotes entre varios procesos como `procesar_flujo`; la memoria no depende
+    del tamaño del corpus. Usa la política vigente (filtro y archivos de patrones cargados).
+
+    Parámetros:
+        entrada: Iterable de líneas (archivo abierto o sys.stdin).
+        procesos: Cantidad de procesos. Por omisión os.cpu_count(); con 1 no se usa pool.
+        lote: Contraseñas por lote. Por omisión 5000.
+        largo_min: Longitud mínima requerida (por omisión 12).
+        detalle: Archivo de texto opcional donde se escribe un JSON por contraseña, en el orden de entrada.
+
+    Returns:
+        dict: total, validas, puntaje_promedio, segundos y los histogramas 'niveles',
+        'faltantes' y 'largos' (los largos desde LARGO_MAXIMO_HISTOGRAMA se agrupan en '64+').
+    """
+    procesos = procesos or os.cpu_count() or 1
+    filtro = _filtro_contraseñas
+    inicio_args = (filtro.ruta if filtro is not None else None, palabras_prohibidas, secuencias_no_recomendadas)
+
+    validas = 0
+    niveles = Counter()
+    faltantes = Counter()
+    largos = Counter()
+    puntajes = 0
+    inicio = time.perf_counter()
+
+    resultados = _repartir_lotes(_analizar_lote, _leer_lotes(entrada, lote), procesos,
+                                 (largo_min, detalle is not None), _iniciar_proceso_analisis, inicio_args)
+    for validas_lote, niveles_lote, faltantes_lote, largos_lote, puntajes_lote, salida in resultados:
+        validas += validas_lote
+        niveles.update(niveles_lote)
+        faltantes.update(faltantes_lote)
+        largos.update(largos_lote)
+        puntajes += puntajes_lote
+        if salida:
+            detalle.write("\n".join(salida) + "\n")
+
+    total = sum(niveles.values())
+    return {
+        "total": total,
+        "validas": validas,
+        "niveles": {nivel: niveles[nivel] for nivel in ("DÉBIL", "INTERMEDIA", "FUERTE")},
+        "faltantes": dict(faltantes.most_common()),
+        "largos": {(f"{largo}+" if largo == LARGO_MAXIMO_HISTOGRAMA else str(largo)): largos[largo]
+                   for largo in sorted(largos)},
+        "puntaje_promedio": puntajes / total if total else 0.0,
+        "segundos": time.perf_counter() - inicio,
+    }
+
+
+def _migrar_lote(usuarios, directorio, compacta, simular=False):
+    """
+    Encripta los `<usuario>.csv` en texto plano de un lote. Se ejecuta dentro de los procesos del pool.
+
+    Solo se tocan archivos de una sola línea no vacía: cualquier otro `.csv` de la
+    carpeta (logs, exportaciones, datos) se omite sin modificarlo. Con `simular` no
+    se escribe nada.
+
+    Returns:
+        tupla: (migrados, omitidos_por_motivo, [(usuario, motivo), ...] de los fallidos).
+    """
+    almacen = AlmacenCSV(directorio)
+    migrados = 0
+    omitidos = Counter()
+    fallidos = []
+    for usuario in usuarios:
+        try:
+            with open(os.path.join(directorio, f"{usuario}.csv"), mode="rt", encoding="utf-8") as archivo:
+                valor = archivo.readline().strip()
+                varias_lineas = any(linea.strip() for linea in archivo)
+        except ValueError:
+            fallidos.append((usuario, "no es texto UTF-8"))
+            continue
+        except OSError:
+            fallidos.append((usuario, "no se pudo leer"))
+            continue
+        if valor == ENCABEZADO_LOG.strip():
+            omitidos["log de eventos"] += 1
+        elif varias_lineas:
+            omitidos["más de una línea (no es un archivo de usuario)"] += 1
+        elif ";" in valor:
+            omitidos["ya encriptado"] += 1
+        elif not valor:
+            fallidos.append((usuario, "contraseña vacía"))
+        else:
+            try:
+                enc, lista = encriptar(valor, compacta)
+                if not simular:
+                    almacen.actualizar(usuario, f"{enc};{lista}")     # temporal + rename
+                migrados += 1
+            except (ValueError, ArchivoNoAccesibleError) as e:
+                fallidos.append((usuario, str(e)))
+    return migrados, omitidos, fallidos
+
+
+def migrar_texto_plano(directorio=".", procesos=None, lote=500, checkpoint=None, compacta=None,
+                       usuarios=None, simular=False):
+    """
+    Encripta en bloque los archivos `<usuario>.csv` que todavía guardan la contraseña en texto plano.
+
+    Los archivos se recorren en orden alfabético, en lotes repartidos entre varios
+    procesos; cada archivo se reescribe con temporal + rename. Los `.csv` con más de
+    una línea no vacía no se consideran archivos de usuario y se omiten. Después de
+    cada lote terminado se guarda el avance en `checkpoint`, así una corrida
+    interrumpida continúa donde quedó. Al terminar, el checkpoint se borra.
+
+    Parámetros:
+        directorio (str, opcional): Carpeta de los archivos. Por defecto la actual.
+        procesos (int, opcional): Cantidad de procesos. Por omisión os.cpu_count(); con 1 no se usa pool.
+        lote (int, opcional): Archivos por lote. Por defecto 500.
+        checkpoint (str, opcional): Archivo de avance. Por defecto '<directorio>/.migracion_texto_plano.json'.
+        compacta (bool, opcional): Guardar la lista en formato 'b64:...'. Por omisión `LISTA_COMPACTA`.
+        usuarios (opcional): Migrar solo estos usuarios en lugar de todos los `*.csv` de la carpeta.
+        simular (bool, opcional): Informar qué se migraría sin escribir nada (ni el checkpoint).
+
+    Returns:
+        dict: archivos, migrados, omitidos (por motivo), fallidos ([usuario, motivo]), segundos,
+        reanudado y simulacion; los totales incluyen las corridas anteriores interrumpidas.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    if compacta is None:
+        compacta = LISTA_COMPACTA
+    if checkpoint is None:
+        checkpoint = os.path.join(directorio, ".migracion_texto_plano.json")
+
+    avance = {"ultimo": None, "archivos": 0, "migrados": 0, "omitidos": {}, "fallidos": []}
+    reanudado = False
+    if not simular:
+        try:
+            with open(checkpoint, "r", encoding="utf-8") as f:
+                avance.update(json.load(f))
+            reanudado = True
+        except (OSError, ValueError):
+            pass
+    omitidos = Counter(avance["omitidos"])
+
+    def guardar_avance():
+        if simular:
+            return
+        avance["omitidos"] = dict(omitidos)
+        temporal = f"{checkpoint}.tmp"
+        try:
+            with open(temporal, "w", encoding="utf-8") as f:
+                json.dump(avance, f, ensure_ascii=False)
+            os.replace(temporal, checkpoint)
+        except OSError as e:
+            raise ArchivoNoAccesibleError(f"No se pudo guardar el avance en '{checkpoint}': {e}")
+
+    if usuarios is None:
+        usuarios = (os.path.basename(ruta)[:-len(".csv")]
+                    for ruta in glob.glob(os.path.join(glob.escape(directorio), "*.csv")))
+    usuarios = sorted(set(usuarios))
+    if avance["ultimo"] is not None:
+        usuarios = [usuario for usuario in usuarios if usuario > avance["ultimo"]]
+    lotes = [usuarios[i:i + lote] for i in range(0, len(usuarios), lote)]
+
+    inicio = time.perf_counter()
+    archivos = 0
+    resultados = _repartir_lotes(_migrar_lote, lotes, procesos, (directorio, compacta, simular))
+    for lote_usuarios, (migrados, omitidos_lote, fallidos) in zip(lotes, resultados):
+        archivos += len(lote_usuarios)
+        avance["ultimo"] = lote_usuarios[-1]
+        avance["archivos"] += len(lote_usuarios)
+        avance["migrados"] += migrados
+        avance["fallidos"].extend(fallidos)
+        omitidos.update(omitidos_lote)
+        guardar_avance()
+
+    segundos = time.perf_counter() - inicio
+    if not simular:
+        try:
+            os.remove(checkpoint)
+        except OSError:
+            pass
+    return {
+        "archivos": avance["archivos"],
+        "migrados": avance["migrados"],
+        "omitidos": dict(omitidos),
+        "fallidos": avance["fallidos"],
+        "segundos": segundos,
+        "por_segundo": archivos / segundos if segundos else 0,
+        "reanudado": reanudado,
+        "simulacion": simular,
+    }
+
+
+def _comando_flujo(args):
+    """Ejecuta los subcomandos 'codificar' y 'decodificar'."""
+    try:
+        entrada = open(args.entrada, encoding="utf-8") if args.entrada != "-" else sys.stdin
+        salida = open(args.salida, "w", encoding="utf-8") if args.salida != "-" else sys.stdout
+    except OSError as e:
+        raise ArchivoNoAccesibleError(f"No se pudo abrir el archivo: {e}")
+    try:
+        filas, errores, segundos = procesar_flujo(entrada, salida, args.comando, args.procesos, args.lote,
+                                                    getattr(args, "compacto", False))
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if salida is not sys.stdout:
+            salida.close()
+    velocidad = filas / segundos if segundos else 0
+    print(f"{filas} filas en {segundos:.2f} s ({velocidad:.0f} filas/s), {errores} con error.", file=sys.stderr)
+    return 1 if errores else 0
+
+
+def _comando_analizar(args):
+    """Ejecuta el subcomando 'analizar': histogramas de robustez de un corpus de contraseñas."""
+    try:
+        # Los corpus exportados suelen traer bytes que no son UTF-8: se reemplazan en vez de abortar
+        entrada = open(args.entrada, encoding="utf-8", errors="replace") if args.entrada != "-" else sys.stdin
+        detalle = open(args.detalle, "w", encoding="utf-8") if args.detalle else None
+    except OSError as e:
+        raise ArchivoNoAccesibleError(f"No se pudo abrir el archivo: {e}")
+    try:
+        resumen = analizar_corpus(entrada, args.procesos, args.lote, args.largo_min, detalle)
+    finally:
+        if entrada is not sys.stdin:
+            entrada.close()
+        if detalle is not None:
+            detalle.close()
+
+    texto = json.dumps(resumen, ensure_ascii=False, indent=2)
+    if args.salida == "-":
+        print(texto)
+    else:
+        try:
+            with open(args.salida, "w", encoding="utf-8") as f:
+                f.write(texto + "\n")
+        except OSError as e:
+            raise ArchivoNoAccesibleError(f"No se pudo escribir el resumen: {e}")
+    velocidad = resumen["total"] / resumen["segundos"] if resumen["segundos"] else 0
+    print(f"{resumen['total']} contraseñas en {resumen['segundos']:.2f} s ({velocidad:.0f}/s), "
+          f"{resumen['validas']} válidas.", file=sys.stderr)
+    return 0
+
+
+def _comando_consultar(args):
+    """Ejecuta el subcomando 'consultar' sobre el log de eventos."""
+    if args.historial:
+        eventos = leer_eventos(args.log, args.desde, args.hasta, args.usuario, args.evento)
+    else:
+        eventos = IndiceLog(args.log).consultar(args.usuario, args.evento, args.desde, args.hasta)
+    cantidad = 0
+    for evento in eventos:
+        print(";".join(evento.values()))
+        cantidad += 1
+    print(f"{cantidad} eventos.", file=sys.stderr)
+    if not args.historial:
+        # El índice solo cubre el log vigente: avisar si hay segmentos rotados en el rango
+        desde, hasta = _normalizar_rango(args.desde, args.hasta)
+        omitidos = [s for s in leer_manifiesto(args.log) if s["hasta"] is not None
+                    and (desde is None or s["hasta"] >= desde) and (hasta is None or s["desde"] <= hasta)]
+        if omitidos:
+            print(f"No se buscó en {len(omitidos)} segmentos rotados ({omitidos[0]['desde']} a "
+                  f"{omitidos[-1]['hasta']}); usá --historial para incluirlos.", file=sys.stderr)
+    return 0
+
+
+def _comando_rotar_log(args):
+    """Ejecuta el subcomando 'rotar-log': pasa el log actual a un segmento comprimido."""
+    segmento = RotadorLog(directorio=args.directorio).rotar(args.log, forzar=True)
+    if segmento is None:
+        print(f"No se rotó '{args.log}' (vacío, inexistente o sin permisos; si quedó un '.pendiente', "
+              f"no se pudo comprimir o anotar en el manifiesto).", file=sys.stderr)
+        return 1
+    print(f"{segmento['eventos']} eventos -> '{segmento['archivo']}' "
+          f"({segmento['desde']} a {segmento['hasta']}).", file=sys.stderr)
+    return 0
+
+
+def _comando_migrar_texto_plano(args):
+    """Ejecuta el subcomando 'migrar-texto-plano': encripta los <usuario>.csv antiguos."""
+    try:
+        resumen = migrar_texto_plano(args.directorio, args.procesos, args.lote, args.checkpoint,
+                                     True if args.compacto else None, args.usuarios, args.simular)
+    except KeyboardInterrupt:
+        print("Migración interrumpida; al volver a ejecutar continúa desde el último lote terminado.",
+              file=sys.stderr)
+        return 130
+    for usuario, motivo in resumen["fallidos"]:
+        print(f"{usuario}: {motivo}", file=sys.stderr)
+    omitidos = ", ".join(f"{cantidad} {motivo}" for motivo, cantidad in resumen["omitidos"].items()) or "ninguno"
+    print(f"{resumen['archivos']} archivos{' (continuación)' if resumen['reanudado'] else ''}: "
+          f"{resumen['migrados']} {'a migrar (simulación)' if resumen['simulacion'] else 'migrados'}, omitidos: {omitidos}, {len(resumen['fallidos'])} con error "
+          f"({resumen['por_segundo']:.0f} archivos/s).", file=sys.stderr)
+    return 1 if resumen["fallidos"] else 0
+
+
+def _comando_migrar_almacen(args):
+    """Ejecuta el subcomando 'migrar-almacen': archivos <usuario>.csv -> base SQLite."""
+    almacen = AlmacenSQLite(args.db or "credenciales.db")
+    try:
+        migrados, existentes = almacen.importar_csv(args.directorio)
+    finally:
+        almacen.cerrar()
+    print(f"{migrados} usuarios migrados a '{almacen.ruta}', {existentes} ya existían.", file=sys.stderr)
+    return 0
+
+
+def _comando_construir_filtro(args):
+    """Ejecuta el subcomando 'construir-filtro': lista de contraseñas -> filtro de Bloom."""
+    entradas = args.entradas
+    if entradas is None:
+        if args.lista == "-":
+            raise EntradaInvalidaError("Con stdin hay que indicar --entradas.")
+        try:
+            with open(args.lista, "rb") as f:
+                entradas = sum(1 for _ in f)
+        except OSError as e:
+            raise ArchivoNoAccesibleError(f"No se pudo abrir el archivo: {e}")
+    memoria_max = int(args.memoria_mb * 1024 * 1024) if args.memoria_mb else None
+
+    try:
+        lista = open(args.lista, "rb") if args.lista != "-" else sys.stdin.buffer
+    except OSError as e:
+        raise ArchivoNoAccesibleError(f"No se pudo abrir el archivo: {e}")
+    inicio = time.perf_counter()
+    try:
+        filtro = FiltroBloom.construir(lista, args.salida, entradas, args.fp, memoria_max)
+    finally:
+        if lista is not sys.stdin.buffer:
+            lista.close()
+    print(f"{filtro.entradas} contraseñas en {time.perf_counter() - inicio:.1f} s -> '{args.salida}' "
+          f"({(filtro.bits + 7) // 8 / 1024 / 1024:.1f} MB, {filtro.hashes} hashes, "
+          f"falsos positivos ~{filtro.tasa_falsos_positivos():.2%}).", file=sys.stderr)
+    filtro.cerrar()
+    return 0
+
+
+def cli(argv=None):
+    """
+    Punto de entrada de línea de comandos.
+
+    Sin subcomando ejecuta el programa interactivo (`main()`); los subcomandos no usan input().
+
+    Parámetros:
+        argv: Lista de argumentos. Por omisión sys.argv[1:].
+
+    Returns:
+        int: Código de salida.
+    """
+    import argparse     # se importa solo si hace falta
+    parser = argparse.ArgumentParser(description="Gestor de credenciales. Sin subcomando inicia el modo interactivo.")
+    parser.add_argument("--db", help="usar una base SQLite de credenciales en lugar de un <usuario>.csv por cuenta")
+    parser.add_argument("--filtro", metavar="ARCHIVO", help="rechazar las contraseñas del filtro de Bloom ARCHIVO")
+    parser.add_argument("--prohibidas", metavar="ARCHIVO", help="palabras prohibidas adicionales (una por línea)")
+    parser.add_argument("--secuencias", metavar="ARCHIVO", help="secuencias no recomendadas adicionales (una por línea)")
+    parser.add_argument("--rotar-mb", type=float, metavar="MB", help="rotar el log de eventos al superar MB megabytes")
+    parser.add_argument("--rotar-horas", type=float, metavar="HORAS", help="rotar el log de eventos cada HORAS horas")
+    parser.add_argument("--perfil", metavar="ARCHIVO", help="activar el perfilado y volcar las métricas en ARCHIVO (JSON)")
+    subcomandos = parser.add_subparsers(dest="comando")
+
+    for nombre, ayuda in (("codificar", "encripta una contraseña en texto plano por línea -> 'enc;lista'"),
+                          ("decodificar", "desencripta líneas 'enc;lista' -> contraseña en texto plano")):
+        sub = subcomandos.add_parser(nombre, help=ayuda)
+        sub.add_argument("entrada", nargs="?", default="-", help="archivo de entrada ('-' = stdin)")
+        sub.add_argument("-o", "--salida", default="-", help="archivo de salida ('-' = stdout)")
+        sub.add_argument("-p", "--procesos", type=int, default=None, help="procesos del pool (por omisión, uno por CPU)")
+        sub.add_argument("--lote", type=int, default=5000, help="líneas por lote enviado a cada proceso")
+        if nombre == "codificar":
+            sub.add_argument("--compacto", action="store_true", help="guardar la lista como 'b64:...' en lugar de 'd|d|...'")
+        sub.set_defaults(func=_comando_flujo)
+
+    sub = subcomandos.add_parser("analizar", help="evalúa un corpus de contraseñas y resume niveles, faltantes y largos")
+    sub.add_argument("entrada", nargs="?", default="-", help="archivo con una contraseña por línea ('-' = stdin)")
+    sub.add_argument("-o", "--salida", default="-", help="resumen JSON ('-' = stdout)")
+    sub.add_argument("--detalle", metavar="ARCHIVO", help="escribir además un JSON por contraseña, en orden")
+    sub.add_argument("-p", "--procesos", type=int, default=None, help="procesos del pool (por omisión, uno por CPU)")
+    sub.add_argument("--lote", type=int, default=5000, help="contraseñas por lote enviado a cada proceso")
+    sub.add_argument("--largo-min", type=int, default=12, help="longitud mínima requerida (por omisión 12)")
+    sub.set_defaults(func=_comando_analizar)
+
+    sub = subcomandos.add_parser("consultar", help="busca eventos en el log usando el índice auxiliar")
+    sub.add_argument("--log", default="eventos_log.csv", help="archivo de log (por omisión eventos_log.csv)")
+    sub.add_argument("--usuario", help="usuario exacto")
+    sub.add_argument("--evento", help="evento exacto, p.ej. login_attempts_exceeded")
+    sub.add_argument("--desde", help="fecha inicial 'AAAA-MM-DD[ HH:MM:SS]'")
+    sub.add_argument("--hasta", help="fecha final inclusiva 'AAAA-MM-DD[ HH:MM:SS]'")
+    sub.add_argument("--historial", action="store_true", help="buscar también en los segmentos rotados (sin índice)")
+    sub.set_defaults(func=_comando_consultar)
+
+    sub = subcomandos.add_parser("rotar-log", help="pasa el log actual a un segmento comprimido con gzip")
+    sub.add_argument("--log", default="eventos_log.csv", help="archivo de log (por omisión eventos_log.csv)")
+    sub.add_argument("--directorio", help="carpeta de los segmentos (por omisión, la del log)")
+    sub.set_defaults(func=_comando_rotar_log)
+
+    sub = subcomandos.add_parser("construir-filtro", help="arma un filtro de Bloom a partir de una lista de contraseñas")
+    sub.add_argument("lista", help="archivo con una contraseña por línea ('-' = stdin)")
+    sub.add_argument("-o", "--salida", default="filtradas.bloom", help="archivo del filtro (por omisión filtradas.bloom)")
+    sub.add_argument("--fp", type=float, default=0.001, help="tasa de falsos positivos buscada (por omisión 0.001)")
+    sub.add_argument("--memoria-mb", type=float, help="tamaño máximo del filtro en MB")
+    sub.add_argument("--entradas", type=int, help="cantidad de contraseñas (si no, se cuentan las líneas)")
+    sub.set_defaults(func=_comando_construir_filtro)
+
+    sub = subcomandos.add_parser("migrar-almacen", help="copia los archivos <usuario>.csv a la base SQLite (--db)")
+    sub.add_argument("directorio", nargs="?", default=".", help="carpeta con los archivos <usuario>.csv")
+    sub.set_defaults(func=_comando_migrar_almacen)
+
+    sub = subcomandos.add_parser("migrar-texto-plano", help="encripta los <usuario>.csv que guardan la contraseña en texto plano")
+    sub.add_argument("directorio", help="carpeta con los archivos <usuario>.csv (obligatoria)")
+    sub.add_argument("--usuarios", nargs="+", metavar="USUARIO", help="migrar solo estos usuarios")
+    sub.add_argument("--simular", action="store_true", help="informar qué se migraría, sin escribir nada")
+    sub.add_argument("-p", "--procesos", type=int, default=None, help="procesos del pool (por omisión, uno por CPU)")
+    sub.add_argument("--lote", type=int, default=500, help="archivos por lote enviado a cada proceso")
+    sub.add_argument("--checkpoint", help="archivo de avance (por omisión <directorio>/.migracion_texto_plano.json)")
+    sub.add_argument("--compacto", action="store_true", help="guardar la lista como 'b64:...' en lugar de 'd|d|...'")
+    sub.set_defaults(func=_comando_migrar_texto_plano)
+
+    args = parser.parse_args(argv)
+    if args.rotar_mb or args.rotar_horas:
+        activar_rotacion_log(int(args.rotar_mb * 1024 * 1024) if args.rotar_mb else None,
+                             args.rotar_horas * 3600 if args.rotar_horas else None)
+    try:
+        if args.filtro:
+            cargar_filtro_contraseñas(args.filtro)
+        if args.prohibidas or args.secuencias:
+            cargar_politica(args.prohibidas, args.secuencias)
+    except ArchivoNoAccesibleError as e:
+        parser.exit(2, f"{parser.prog}: error: {e}\n")
+    if args.perfil:
+        activar_perfilado(args.perfil)
+    if args.db and args.comando is None:
+        global ALMACEN_CREDENCIALES
+        try:
+            ALMACEN_CREDENCIALES = AlmacenSQLite(args.db)
+        except ArchivoNoAccesibleError as e:
+            parser.exit(2, f"{parser.prog}: error: {e}\n")
+    if args.comando is None:
+        main()
+        return 0
+    try:
+        return args.func(args)
+    except (ArchivoNoAccesibleError, EntradaInvalidaError) as e:
+        parser.exit(2, f"{parser.prog}: error: {e}\n")
+
+
 if __name__ == "__main__": 
-    main()
\ No newline at end of file
+    sys.exit(cli())
\ No newline at end of file
@@ -0,0 +1,247 @@
+"""
+Servidor de autenticación asincrónico basado en la lógica de `login()`.
+
+Atiende muchos clientes a la vez desde un solo proceso (asyncio), por TCP local o
+socket Unix. El protocolo es JSON por líneas:
+
+    -> {"usuario": "pepe", "contraseña": "..."}
+    <- {"ok": true}
+    <- {"ok": false, "error": "credenciales_invalidas", "intentos_restantes": 2}
+
+Los nombres de usuario con separadores de ruta o '..' y las contraseñas vacías se
+rechazan como 'solicitud_invalida'.
+Errores posibles: 'solicitud_invalida', 'usuario_no_existe', 'credenciales_invalidas',
+'bloqueado' y 'error_interno'. Si la solicitud trae "id", se devuelve en la respuesta.
+Una línea de más de 64 KiB se responde con 'solicitud_invalida' y se cierra la conexión.
+
+Igual que `login()`, tras 3 contraseñas incorrectas seguidas se registra
+`login_attempts_exceeded`; el usuario queda bloqueado durante `bloqueo` segundos.
+La lectura y desencriptado de credenciales se hace fuera del event loop; con
+`--cache-ttl` los logins repetidos se resuelven desde `CacheCredenciales`.
+
+Uso:
+    python servidor_auth.py servir --port 8765 [--db credenciales.db]
+    python servidor_auth.py carga --usuario pepe --contraseña '...' --clientes 50 --solicitudes 200
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import statistics
+import sys
+import time
+
+import pass_logic
+
+
+def usuario_valido(usuario):
+    """
+    False si el nombre podría salirse de la carpeta del almacén (separadores de ruta, '..').
+
+    `AlmacenCSV` arma la ruta `<usuario>.csv` con el nombre tal cual.
+    """
+    return not ("/" in usuario or "\\" in usuario or ".." in usuario or "\0" in usuario)
+
+
+class ServidorAutenticacion:
+    """
+    Servidor asyncio de autenticación con bloqueo por intentos fallidos.
+
+    Parámetros:
+        almacen: Almacén de credenciales. Por omisión `pass_logic.ALMACEN_CREDENCIALES`.
+        intentos (int, opcional): Contraseñas incorrectas seguidas antes del bloqueo. Por defecto 3.
+        bloqueo (float, opcional): Segundos que dura el bloqueo. Por defecto 300.
+    """
+
+    def __init__(self, almacen=None, intentos=3, bloqueo=300.0):
+        self.almacen = almacen
+        self.intentos = intentos
+        self.bloqueo = bloqueo
+        # usuario -> [fallos_seguidos, bloqueado_hasta]; solo se toca desde el event loop
+        self._fallos = {}
+
+    async def autenticar(self, usuario, contraseña):
+        """
+        Verifica una contraseña y devuelve la respuesta del protocolo.
+
+        Returns:
+            dict: {'ok': True} o {'ok': False, 'error': ...}.
+        """
+        if self._bloqueado(usuario):
+            return {"ok": False, "error": "bloqueado"}
+
+        loop = asyncio.get_running_loop()
+        try:
+            contraseña_guardada = await loop.run_in_executor(
+                None, pass_logic.leer_contraseña_guardada, usuario, self.almacen)
+        except (pass_logic.CredencialesInvalidasError, pass_logic.ArchivoNoAccesibleError):
+            return {"ok": False, "error": "error_interno"}
+        except Exception as e:
+            # p.ej. un <usuario>.csv que no es UTF-8: se responde igual y se deja constancia
+            await loop.run_in_executor(None, lambda: pass_logic.log_event(
+                "unespected_error", "ERROR", f"{type(e).__name__}: {e}", usuario=usuario, funcion="servidor_auth"))
+            return {"ok": False, "error": "error_interno"}
+        if contraseña_guardada is None:
+            return {"ok": False, "error": "usuario_no_existe"}
+
+        # Mientras se leía la contraseña otras solicitudes del mismo usuario pudieron fallar:
+        # el estado se vuelve a leer y desde acá hasta actualizarlo no hay ningún await.
+        ahora = time.monotonic()
+        if self._bloqueado(usuario, ahora):
+            return {"ok": False, "error": "bloqueado"}
+        estado = self._fallos.get(usuario)
+
+        # surrogatepass: JSON admite surrogates sueltos, que no son UTF-8 válido
+        if hmac.compare_digest(contraseña.encode("utf-8", "surrogatepass"),
+                               contraseña_guardada.encode("utf-8", "surrogatepass")):
+            self._fallos.pop(usuario, None)
+            return {"ok": True}
+
+        if estado is None or estado[1]:
+            # primer fallo, o el bloqueo anterior ya venció
+            estado = self._fallos[usuario] = [0, 0]
+        estado[0] += 1
+        if estado[0] >= self.intentos:
+            estado[1] = ahora + self.bloqueo
+            await loop.run_in_executor(None, lambda: pass_logic.log_event(
+                "login_attempts_exceeded", "WARN", f"Excediste los {self.intentos} intentos.",
+                usuario=usuario, funcion="servidor_auth"))
+            return {"ok": False, "error": "bloqueado"}
+        return {"ok": False, "error": "credenciales_invalidas", "intentos_restantes": self.intentos - estado[0]}
+
+    def _bloqueado(self, usuario, ahora=None):
+        estado = self._fallos.get(usuario)
+        return estado is not None and estado[1] > (time.monotonic() if ahora is None else ahora)
+
+    async def atender(self, lector, escritor):
+        """Atiende una conexión: una solicitud JSON por línea, una respuesta por línea."""
+        try:
+            while True:
+                try:
+                    linea = await lector.readline()
+                except ValueError:
+                    # Línea más larga que el límite del lector: se pierde el encuadre, se responde y se corta
+                    escritor.write(json.dumps({"ok": False, "error": "solicitud_invalida"}).encode("utf-8") + b"\n")
+                    await escritor.drain()
+                    break
+                if not linea:
+                    break
+                solicitud = None
+                try:
+                    solicitud = json.loads(linea)
+                    usuario = solicitud["usuario"]
+                    contraseña = solicitud["contraseña"]
+                    if not isinstance(usuario, str) or not isinstance(contraseña, str) or not usuario or not contraseña:
+                        raise TypeError
+                    if not usuario_valido(usuario):
+                        raise ValueError
+                except (ValueError, KeyError, TypeError):
+                    respuesta = {"ok": False, "error": "solicitud_invalida"}
+                else:
+                    respuesta = await self.autenticar(usuario, contraseña)
+                if isinstance(solicitud, dict) and "id" in solicitud:
+                    respuesta["id"] = solicitud["id"]
+                escritor.write(json.dumps(respuesta, ensure_ascii=False).encode("utf-8") + b"\n")
+                await escritor.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def iniciar(self, host="127.0.0.1", port=8765, unix=None):
+        """Abre el socket (TCP local o Unix) y devuelve el `asyncio.Server`."""
+        if unix:
+            return await asyncio.start_unix_server(self.atender, path=unix)
+        return await asyncio.start_server(self.atender, host, port)
+
+
+async def prueba_carga(usuario, contraseña, host="127.0.0.1", port=8765, unix=None, clientes=50, solicitudes=200):
+    """
+    Cliente de carga: `clientes` conexiones concurrentes, cada una con `solicitudes` pedidos seguidos.
+
+    Returns:
+        dict: total, errores, segundos, por_segundo, p50_ms y p99_ms.
+    """
+    latencias = []
+    errores = 0
+    mensaje = json.dumps({"usuario": usuario, "contraseña": contraseña}, ensure_ascii=False).encode("utf-8") + b"\n"
+
+    async def cliente():
+        nonlocal errores
+        if unix:
+            lector, escritor = await asyncio.open_unix_connection(unix)
+        else:
+            lector, escritor = await asyncio.open_connection(host, port)
+        try:
+            for _ in range(solicitudes):
+                inicio = time.perf_counter()
+                escritor.write(mensaje)
+                await escritor.drain()
+                respuesta = json.loads(await lector.readline())
+                latencias.append(time.perf_counter() - inicio)
+                if not respuesta.get("ok"):
+                    errores += 1
+        finally:
+            escritor.close()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente() for _ in range(clientes)))
+    segundos = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        "total": len(latencias),
+        "errores": errores,
+        "segundos": segundos,
+        "por_segundo": len(latencias) / segundos if segundos else 0,
+        "p50_ms": statistics.median(latencias) * 1000 if latencias else 0,
+        "p99_ms": latencias[min(len(latencias) - 1, int(0.99 * len(latencias)))] * 1000 if latencias else 0,
+    }
+
+
+async def _servir(args):
+    almacen = pass_logic.AlmacenSQLite(args.db) if args.db else None
+    if args.cache_ttl > 0:
+        pass_logic.activar_cache_credenciales(args.cache, args.cache_ttl)
+    servidor = ServidorAutenticacion(almacen, bloqueo=args.bloqueo)
+    socket_servidor = await servidor.iniciar(args.host, args.port, args.unix)
+    print(f"Escuchando en {args.unix or f'{args.host}:{args.port}'}", file=sys.stderr)
+    async with socket_servidor:
+        await socket_servidor.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor de autenticación asincrónico (JSON por líneas).")
+    parser.add_argument("--host", default="127.0.0.1", help="dirección TCP (por omisión 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="puerto TCP (por omisión 8765)")
+    parser.add_argument("--unix", help="usar un socket Unix en esta ruta en lugar de TCP")
+    subcomandos = parser.add_subparsers(dest="comando", required=True)
+
+    sub = subcomandos.add_parser("servir", help="inicia el servidor")
+    sub.add_argument("--db", help="base SQLite de credenciales (por omisión, archivos <usuario>.csv)")
+    sub.add_argument("--bloqueo", type=float, default=300.0, help="segundos de bloqueo tras 3 fallos")
+    sub.add_argument("--cache", type=int, default=1024, help="usuarios en la caché de credenciales")
+    sub.add_argument("--cache-ttl", type=float, default=0.0,
+                     help="segundos de validez de la caché de credenciales (0 = sin caché)")
+
+    sub = subcomandos.add_parser("carga", help="prueba de carga contra un servidor en marcha")
+    sub.add_argument("--usuario", required=True)
+    sub.add_argument("--contraseña", required=True)
+    sub.add_argument("--clientes", type=int, default=50, help="conexiones concurrentes")
+    sub.add_argument("--solicitudes", type=int, default=200, help="solicitudes por conexión")
+
+    args = parser.parse_args(argv)
+    if args.comando == "servir":
+        try:
+            asyncio.run(_servir(args))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    resultado = asyncio.run(prueba_carga(args.usuario, args.contraseña, args.host, args.port, args.unix,
+                                         args.clientes, args.solicitudes))
+    print(json.dumps(resultado, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())